@@ -0,0 +1,160 @@
+import argparse
+import datetime as date
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.io import loadmat
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import mat_expanded  # noqa: E402
+from synthetic_mat import write_imdb_mat  # noqa: E402
+
+# Benchmark the vectorized conversion engine against the original per-row loops
+# on a synthetic imdb.mat, and check that both produce the same text columns.
+
+
+# The original per-row implementation, kept here as the reference
+def legacy_text_frame(imdb):
+    imdb_dob = imdb[0][0][0][0]
+    imdb_photo_taken = imdb[0][0][1][0]
+    imdb_full_path = imdb[0][0][2][0]
+    imdb_gender = imdb[0][0][3][0]
+    imdb_name = imdb[0][0][4][0]
+    imdb_face_location = imdb[0][0][5][0]
+    imdb_face_score1 = imdb[0][0][6][0]
+    imdb_face_score2 = imdb[0][0][7][0]
+    imdb_celeb_id = imdb[0][0][9][0]
+
+    imdb_path = ['imdb_crop/' + path[0] for path in imdb_full_path]
+    imdb_genders = ['male' if imdb_gender[n] == 1 else 'female' for n in range(len(imdb_gender))]
+
+    imdb_names = []
+    for name in imdb_name:
+        if isinstance(name, np.ndarray) and name.size > 0:
+            imdb_names.append(str(name[0]))
+        else:
+            imdb_names.append(str(name))
+
+    imdb_celeb_indices = []
+    for i in range(len(imdb_celeb_id)):
+        val = imdb_celeb_id[i]
+        imdb_celeb_indices.append(int(val) if not np.isnan(val) else -1)
+
+    imdb_face_locs = []
+    for loc in imdb_face_location:
+        coords = ["0", "0", "0", "0"]
+        if isinstance(loc, np.ndarray) and loc.size >= 4:
+            for i in range(4):
+                try:
+                    if np.isscalar(loc[i]):
+                        coords[i] = str(int(loc[i]))
+                    elif isinstance(loc[i], np.ndarray) and loc[i].size == 1:
+                        coords[i] = str(int(loc[i].flat[0]))
+                    elif hasattr(loc[i], 'tolist'):
+                        value = loc[i].tolist()
+                        if isinstance(value, list) and len(value) == 1:
+                            coords[i] = str(int(value[0]))
+                except Exception:
+                    pass
+        imdb_face_locs.append(",".join(coords))
+
+    def matlab_datenum_to_datetime(datenum):
+        try:
+            if np.isnan(datenum) or datenum <= 0:
+                return None
+            days = float(datenum) - 366
+            result_date = date.datetime.fromordinal(max(1, int(days)))
+            result_date += date.timedelta(days=float(days % 1))
+            if result_date.year < 1850 or result_date.year > 2025:
+                return None
+            return result_date
+        except Exception:
+            return None
+
+    imdb_formatted_dob = []
+    for datenum in imdb_dob:
+        dt = matlab_datenum_to_datetime(datenum)
+        imdb_formatted_dob.append(dt.strftime('%Y-%m-%d') if dt else 'unknown')
+
+    imdb_age = []
+    for i in range(len(imdb_formatted_dob)):
+        diff = -1
+        try:
+            if imdb_formatted_dob[i] != 'unknown':
+                d1 = date.datetime.strptime(imdb_formatted_dob[i], '%Y-%m-%d')
+                photo_year = int(imdb_photo_taken[i])
+                if photo_year > 1900 and photo_year < 2023:
+                    d2 = date.datetime(year=photo_year, month=1, day=1)
+                    diff = d2.year - d1.year
+                    if d2.month < d1.month or (d2.month == d1.month and d2.day < d1.day):
+                        diff -= 1
+                    if diff < 0 or diff > 100:
+                        diff = -1
+        except Exception:
+            diff = -1
+        imdb_age.append(diff)
+
+    final_imdb = np.vstack((
+        imdb_age,
+        imdb_genders,
+        imdb_path,
+        imdb_names,
+        imdb_formatted_dob,
+        imdb_photo_taken,
+        imdb_face_locs,
+        imdb_face_score1,
+        imdb_face_score2,
+        imdb_celeb_indices
+    )).T
+    final_imdb_df = pd.DataFrame(final_imdb)
+    final_imdb_df.columns = mat_expanded.cols
+    return final_imdb_df
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the .mat conversion engine')
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--mat', default=None, help='existing imdb.mat to use instead of a synthetic fixture')
+    parser.add_argument('--skip-legacy', action='store_true', help='only time the vectorized engine')
+    args = parser.parse_args()
+
+    mat_path = args.mat or os.path.join('bench_data', f'imdb_{args.rows}.mat')
+    if not os.path.exists(mat_path):
+        print(f"Generating synthetic fixture {mat_path} ({args.rows} rows)...")
+        write_imdb_mat(mat_path, args.rows)
+
+    imdb, load_time = timed(lambda: loadmat(mat_path)['imdb'])
+    print(f"loadmat: {load_time:.2f}s")
+
+    frame, convert_time = timed(lambda: mat_expanded.to_typed_frame(mat_expanded.convert_struct(imdb, 'imdb_crop/')))
+    new_df, text_time = timed(mat_expanded.to_text_frame, frame)
+    new_time = convert_time + text_time
+    print(f"vectorized conversion: {convert_time:.2f}s + text rendering {text_time:.2f}s "
+          f"({len(new_df) / new_time:,.0f} rows/s)")
+
+    if not args.skip_legacy:
+        old_df, old_time = timed(legacy_text_frame, imdb)
+        print(f"legacy per-row conversion: {old_time:.2f}s ({len(old_df) / old_time:,.0f} rows/s)")
+        print(f"speedup: {old_time / new_time:.1f}x")
+
+        # Two columns are expected to differ: the per-row loop indexed the 1x4
+        # face box as if it were flat and wrote 0,0,0,0 for every row, and it
+        # wrote empty names as the literal text "[]"
+        for col in mat_expanded.cols:
+            if col == 'face_location':
+                continue
+            if col == 'name':
+                old_df[col] = old_df[col].replace('[]', '')
+            mismatches = int((old_df[col].astype(str).values != new_df[col].astype(str).values).sum())
+            status = 'identical' if mismatches == 0 else f'{mismatches} rows differ'
+            print(f"  {col:<14} {status}")
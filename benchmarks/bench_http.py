@@ -0,0 +1,114 @@
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from load_test import WEB_DIR, client, image_paths, start, tree_memory, wait_ready
+from results import compare, write_results
+from synthetic_mat import write_fixture
+
+# Throughput and latency of the main routes, one route at a time, on the
+# production server (gunicorn + wsgi.py) over a synthetic dataset directory.
+# Unlike load_test.py, which mixes requests to compare worker counts, every
+# scenario here gets the whole server, so a slower route shows up by name.
+#
+# The dataset directory is made as needed: the synthetic .mat files and their
+# placeholder crops, the converted dataset (mat_expanded.py --arrow), and a
+# copy of web/ inside it, since the app reads the dataset from '..'.
+
+MAT_EXPANDED = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'mat_expanded.py')
+
+# Scenario -> request URLs (see load_test.client); {page} is a random page number,
+# and the images scenario downloads random image paths instead
+SCENARIOS = {
+    'data': ['/api/data?page={page}&limit=50'],
+    'data_search': ['/api/data?page={page}&limit=50&search=kelly', '/api/data?page=1&limit=50&search=grace {page}'],
+    'data_filtered': ['/api/data?page={page}&limit=50&age_min=20&age_max=40&sort=face_score&order=desc'],
+    'unique_names': ['/api/unique-names'],
+    'images': None,
+}
+
+
+# Make the dataset directory servable: crops, converted dataset, web/ copy
+def prepare(root, rows, wiki_rows):
+    write_fixture(root, rows, wiki_rows, images=True)
+    if not os.path.exists(os.path.join(root, 'dataset.arrow')):
+        print("Converting the synthetic dataset...")
+        subprocess.run([sys.executable, os.path.abspath(MAT_EXPANDED), '--arrow'], cwd=root,
+                       stdout=subprocess.DEVNULL, check=True)
+    web_dir = os.path.join(root, 'web')
+    shutil.copytree(WEB_DIR, web_dir, dirs_exist_ok=True, ignore=shutil.ignore_patterns('__pycache__'))
+    return web_dir
+
+
+def run_scenario(name, args, images):
+    urls = SCENARIOS[name]
+    paths = None if urls else images
+    with ProcessPoolExecutor(max_workers=args.clients) as pool:
+        results = list(pool.map(client, [args.port] * args.clients, [args.duration] * args.clients,
+                                range(args.clients), [paths] * args.clients, [urls] * args.clients))
+    latencies = np.concatenate([np.asarray(lat) for lat, _ in results]) * 1000
+    return {
+        f'{name}_rps': round(len(latencies) / args.duration, 1),
+        f'{name}_p50_ms': round(float(np.percentile(latencies, 50)), 2),
+        f'{name}_p95_ms': round(float(np.percentile(latencies, 95)), 2),
+        f'{name}_p99_ms': round(float(np.percentile(latencies, 99)), 2),
+        f'{name}_errors': sum(err for _, err in results),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the web routes one at a time on a synthetic dataset')
+    parser.add_argument('--rows', type=int, default=500000, help='rows of the synthetic imdb.mat')
+    parser.add_argument('--wiki-rows', type=int, default=0, help='rows of the synthetic wiki.mat')
+    parser.add_argument('--dir', default=None, help='dataset directory (default bench_data/fixture_<rows>_<wiki rows>)')
+    parser.add_argument('--scenarios', nargs='+', default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--threads', type=int, default=4, help='threads per worker')
+    parser.add_argument('--clients', type=int, default=8, help='concurrent client processes')
+    parser.add_argument('--duration', type=float, default=10, help='seconds of load per scenario')
+    parser.add_argument('--port', type=int, default=5078)
+    parser.add_argument('--timeout', type=float, default=300, help='seconds to wait for the server to start')
+    parser.add_argument('--json', default=None, metavar='PATH', help='write the results to PATH')
+    parser.add_argument('--baseline', default=None, metavar='PATH', help='compare with earlier results')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='slowdown counted as a regression')
+    args = parser.parse_args()
+
+    root = args.dir or os.path.join('bench_data', f'fixture_{args.rows}_{args.wiki_rows}')
+    web_dir = prepare(root, args.rows, args.wiki_rows)
+
+    env = dict(os.environ, WEB_WORKERS=str(args.workers), WEB_THREADS=str(args.threads),
+               WEB_BIND=f'127.0.0.1:{args.port}')
+    server = start(['-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'], web_dir, env)
+    metrics = {}
+    try:
+        wait_ready(args.port, args.timeout)
+        images = image_paths(args.port, 1000) if 'images' in args.scenarios else []
+        if 'images' in args.scenarios and not images:
+            raise SystemExit("no images found for the images scenario")
+        print(f"{args.clients} clients, {args.duration:.0f}s per scenario, "
+              f"{args.workers} workers x {args.threads} threads")
+        print(f"{'scenario':<16}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+        for name in args.scenarios:
+            result = run_scenario(name, args, images)
+            metrics.update(result)
+            print(f"{name:<16}{result[f'{name}_rps']:>9.0f}{result[f'{name}_p50_ms']:>9.1f}"
+                  f"{result[f'{name}_p95_ms']:>9.1f}{result[f'{name}_p99_ms']:>9.1f}{result[f'{name}_errors']:>8}")
+        _, rss, pss = tree_memory(server.pid)
+        metrics['server_rss_bytes'] = rss
+        metrics['server_pss_bytes'] = pss
+        print(f"server: RSS {rss / 2**20:.0f} MB, PSS {pss / 2**20:.0f} MB")
+    finally:
+        server.terminate()
+        server.wait()
+
+    params = {'rows': args.rows, 'wiki_rows': args.wiki_rows, 'workers': args.workers, 'threads': args.threads,
+              'clients': args.clients, 'duration': args.duration}
+    if args.json:
+        write_results(args.json, 'http', params, metrics)
+    if args.baseline and compare(metrics, args.baseline, args.tolerance):
+        sys.exit(1)
@@ -0,0 +1,86 @@
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+from results import compare, write_results
+from synthetic_mat import write_fixture
+
+# End-to-end benchmark of the conversion pipeline: run mat_expanded.py on a
+# synthetic dataset directory, once from scratch (--force) and once with every
+# stage cached, and record the wall time and peak memory of each run along with
+# the per-stage times of its profile report (see pipeline_profile.py).
+
+MAT_EXPANDED = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'mat_expanded.py')
+
+
+# Run mat_expanded.py in the dataset directory: (wall seconds, peak RSS in bytes
+# of the largest process, including the pool workers, profile report). The peak
+# comes from the report: the profiler resets the kernel's high-water mark (and
+# with it ru_maxrss) at every stage, so the rusage of the run would only cover
+# its last stage.
+def run_pipeline(root, options):
+    report = os.path.join('preprocess_cache', 'bench_profile.json')
+    command = [sys.executable, os.path.abspath(MAT_EXPANDED), '--profile-report', report] + options
+    started = time.perf_counter()
+    process = subprocess.run(command, cwd=root, stdout=subprocess.DEVNULL)
+    wall = time.perf_counter() - started
+    if process.returncode != 0:
+        raise SystemExit(f"mat_expanded.py {' '.join(options)} failed with exit code {process.returncode}")
+    with open(os.path.join(root, report)) as f:
+        report = json.load(f)
+    return wall, max((stage['peak_rss_bytes'] for stage in report['stages']), default=0), report
+
+
+def stage_metric(name):
+    return 'stage_' + re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_') + '_s'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark mat_expanded.py end to end on a synthetic dataset')
+    parser.add_argument('--rows', type=int, default=500000, help='rows of the synthetic imdb.mat')
+    parser.add_argument('--wiki-rows', type=int, default=0, help='rows of the synthetic wiki.mat')
+    parser.add_argument('--dir', default=None, help='dataset directory (default bench_data/fixture_<rows>_<wiki rows>)')
+    parser.add_argument('--streaming', action='store_true', help='run the pipeline with --streaming')
+    parser.add_argument('--arrow', action='store_true', help='also write dataset.arrow')
+    parser.add_argument('--csv', action='store_true', help='also write the CSV exports')
+    parser.add_argument('--workers', type=int, default=None, help='conversion processes')
+    parser.add_argument('--json', default=None, metavar='PATH', help='write the results to PATH')
+    parser.add_argument('--baseline', default=None, metavar='PATH', help='compare with earlier results')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='slowdown counted as a regression')
+    args = parser.parse_args()
+
+    root = args.dir or os.path.join('bench_data', f'fixture_{args.rows}_{args.wiki_rows}')
+    if not os.path.exists(os.path.join(root, 'imdb_crop', 'imdb.mat')):
+        print(f"Generating synthetic dataset {root}...")
+        # The pipeline only reads the .mat files; bench_http.py adds the crops
+        write_fixture(root, args.rows, args.wiki_rows, images=False)
+
+    options = [flag for flag, wanted in (('--streaming', args.streaming), ('--arrow', args.arrow),
+                                          ('--csv', args.csv)) if wanted]
+    if args.workers:
+        options += ['--workers', str(args.workers)]
+
+    metrics = {}
+    for run, extra in (('cold', ['--force']), ('warm', [])):
+        wall, peak, report = run_pipeline(root, options + extra)
+        metrics[f'{run}_wall_s'] = round(wall, 3)
+        metrics[f'{run}_peak_rss_bytes'] = peak
+        print(f"{run}: {wall:.2f}s, peak RSS {peak / 2**20:.0f} MB")
+        if run == 'cold':
+            rows = sum(stage['rows'] or 0 for stage in report['stages'] if stage['name'] == 'dataset')
+            metrics['cold_rows_per_s'] = round(rows / wall)
+            # Top-level stages only; the nested ones are in the profile report
+            for stage in report['stages']:
+                if '/' not in stage['name']:
+                    metrics[stage_metric(stage['name'])] = stage['wall_s']
+                    print(f"  {stage['name']:<24}{stage['wall_s']:>9.2f}s{stage['peak_rss_bytes'] / 2**20:>8.0f} MB")
+
+    params = {'rows': args.rows, 'wiki_rows': args.wiki_rows, 'options': options}
+    if args.json:
+        write_results(args.json, 'pipeline', params, metrics)
+    if args.baseline and compare(metrics, args.baseline, args.tolerance):
+        sys.exit(1)
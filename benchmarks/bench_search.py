@@ -0,0 +1,50 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'web'))
+
+from search_index import NameIndex  # noqa: E402
+
+# Compare /api/data name search through NameIndex with the full-column scan
+# it replaced, on a generated dataset.parquet (or any typed dataset).
+
+TERMS = ['a', 'ke', 'kel', 'kelly', 'grace kelly', 'Astaire 1', 'ginger rogers 12', 'zzz']
+
+
+def scan(names, term):
+    return np.flatnonzero(names.fillna('').str.lower().str.contains(term.lower(), regex=False).to_numpy())
+
+
+def best_of(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark name search: index vs scan')
+    parser.add_argument('dataset', nargs='?', default='dataset.parquet')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    names = pd.read_parquet(args.dataset, columns=['name'])['name']
+    index, build_time = best_of(lambda: NameIndex(names), 1)
+    print(f"{len(names)} rows, {len(index.names)} distinct names, index built in {build_time * 1000:.0f} ms")
+    print(f"{'term':<20}{'rows':>8}{'scan ms':>10}{'substr ms':>11}{'prefix ms':>11}{'speedup':>9}")
+
+    for term in TERMS:
+        expected, scan_time = best_of(lambda: scan(names, term), args.repeat)
+        found, index_time = best_of(lambda: index.search(term), args.repeat)
+        _, prefix_time = best_of(lambda: index.prefix(term), args.repeat)
+        if not np.array_equal(expected, found):
+            raise SystemExit(f"result mismatch for {term!r}: {len(expected)} vs {len(found)} rows")
+        print(f"{term:<20}{len(found):>8}{scan_time * 1000:>10.1f}{index_time * 1000:>11.3f}"
+              f"{prefix_time * 1000:>11.3f}{scan_time / index_time:>8.0f}x")
@@ -0,0 +1,85 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'web'))
+
+from serialize import encode_columns, encode_envelope, encode_records  # noqa: E402
+
+# Compare the /api/data page encoder with the to_dict + custom JSONEncoder path
+# it replaced, for a range of page sizes, and check both decode to the same rows.
+
+FACE_BOX_COLS = ['face_x1', 'face_y1', 'face_x2', 'face_y2']
+LIMITS = [20, 200, 2000, 20000]
+
+
+class LegacyJSONEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, float):
+            if np.isnan(obj):
+                return None
+            if np.isinf(obj):
+                return None
+        if pd.isna(obj):
+            return None
+        return super().default(obj)
+
+
+# The original page shaping, kept here as the reference
+def legacy_page(df_page):
+    page = df_page.drop(columns=FACE_BOX_COLS)
+    page['dob'] = df_page['dob'].dt.strftime('%Y-%m-%d')
+    page['face_location'] = df_page[FACE_BOX_COLS].astype(str).agg(','.join, axis=1)
+    page = page.replace([np.inf, -np.inf], np.nan).astype(object)
+    page = page.where(page.notna(), None)
+    records = page.to_dict(orient='records')
+    return json.dumps({'data': records, 'total': len(df_page)}, cls=LegacyJSONEncoder, sort_keys=True)
+
+
+def fast_page(df_page, encode=encode_records):
+    page = df_page.drop(columns=FACE_BOX_COLS)
+    boxes = zip(*(df_page[col].tolist() for col in FACE_BOX_COLS))
+    page['face_location'] = ['{},{},{},{}'.format(*box) for box in boxes]
+    return encode_envelope(encode(page), total=len(df_page))
+
+
+def best_of(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark /api/data page serialization')
+    parser.add_argument('dataset', nargs='?', default='dataset.parquet')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    df = pd.read_parquet(args.dataset)
+    print(f"{len(df)} rows")
+    print(f"{'limit':>7}{'legacy ms':>11}{'records ms':>12}{'columns ms':>12}{'speedup':>9}{'records KB':>12}{'columns KB':>12}")
+
+    for limit in LIMITS:
+        df_page = df.iloc[len(df) // 3:len(df) // 3 + limit]
+        legacy, legacy_time = best_of(lambda: legacy_page(df_page), args.repeat)
+        records, records_time = best_of(lambda: fast_page(df_page), args.repeat)
+        columns, columns_time = best_of(lambda: fast_page(df_page, encode_columns), args.repeat)
+
+        # Both paths must decode to the same rows; the columnar shape must transpose to them
+        expected = json.loads(legacy)['data']
+        if json.loads(records)['data'] != expected:
+            raise SystemExit(f"record mismatch at limit {limit}")
+        transposed = json.loads(columns)['data']
+        if [dict(zip(transposed, row)) for row in zip(*transposed.values())] != expected:
+            raise SystemExit(f"columnar mismatch at limit {limit}")
+
+        print(f"{limit:>7}{legacy_time * 1000:>11.1f}{records_time * 1000:>12.2f}{columns_time * 1000:>12.2f}"
+              f"{legacy_time / records_time:>8.1f}x{len(records) / 1024:>12.0f}{len(columns) / 1024:>12.0f}")
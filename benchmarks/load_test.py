@@ -0,0 +1,171 @@
+import argparse
+import http.client
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Load-test the production server (gunicorn + wsgi.py) at several worker counts:
+# throughput and latency under concurrent clients, and the memory of the whole
+# process tree. PSS splits shared pages between the processes that map them,
+# so it shows whether adding workers multiplies the dataset or shares it.
+#
+# With --image-clients, extra clients download images at the same time, from
+# the gunicorn workers or (with --image-server) from the async image server,
+# to show how image bursts affect the /api/data latency.
+
+WEB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'web')
+
+# A mix of what the grid does: plain pages, searches, cursor-less deep pages, name lookups
+REQUESTS = [
+    '/api/data?page={page}&limit=50',
+    '/api/data?page={page}&limit=50&search=kelly',
+    '/api/data?page=1&limit=50&search=grace {page}',
+    '/api/names?prefix=fr&limit=50',
+]
+
+
+def tree_memory(pid):
+    pids = [pid]
+    children_path = f'/proc/{pid}/task/{pid}/children'
+    if os.path.exists(children_path):
+        pids += [int(child) for child in open(children_path).read().split()]
+    rss = pss = 0
+    for p in pids:
+        try:
+            for line in open(f'/proc/{p}/smaps_rollup'):
+                if line.startswith('Rss:'):
+                    rss += int(line.split()[1]) * 1024
+                elif line.startswith('Pss:'):
+                    pss += int(line.split()[1]) * 1024
+        except FileNotFoundError:
+            pass
+    return len(pids) - 1, rss, pss
+
+
+def wait_ready(port, timeout, url='/api/data?limit=1'):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('GET', url)
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"server on port {port} did not become ready in {timeout}s")
+
+
+# Image paths of the first rows, for the image clients
+def image_paths(port, count):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    conn.request('GET', f'/api/data?limit={count}&format=columns')
+    data = json.loads(conn.getresponse().read())['data']
+    return [path for path, has_image in zip(data['path'], data['has_image']) if has_image]
+
+
+# One client: a keep-alive connection issuing requests back to back (pool worker).
+# API clients pick from `requests` (REQUESTS by default), image clients (paths
+# given) download images.
+def client(port, duration, seed, paths=None, requests=REQUESTS):
+    rng = np.random.default_rng(seed)
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        if paths:
+            url = '/images/' + paths[rng.integers(len(paths))]
+        else:
+            url = requests[rng.integers(len(requests))].format(page=int(rng.integers(1, 200))).replace(' ', '%20')
+        start = time.perf_counter()
+        try:
+            conn.request('GET', url)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        latencies.append(time.perf_counter() - start)
+    return latencies, errors
+
+
+def start(command, web_dir, env):
+    return subprocess.Popen([sys.executable] + command, cwd=web_dir, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def run(workers, args):
+    env = dict(os.environ, WEB_WORKERS=str(workers), WEB_THREADS=str(args.threads),
+               WEB_BIND=f'127.0.0.1:{args.port}')
+    servers = [start(['-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'], args.web_dir, env)]
+    image_port = args.port
+    if args.image_server:
+        image_port = args.port + 1
+        servers.append(start(['image_server.py', '--host', '127.0.0.1', '--port', str(image_port)], args.web_dir, env))
+    try:
+        wait_ready(args.port, args.timeout)
+        _, _, idle_pss = tree_memory(servers[0].pid)
+        paths = image_paths(args.port, 500) if args.image_clients else []
+        if args.image_clients and not paths:
+            raise SystemExit("no images found for the image clients")
+        if args.image_server:
+            wait_ready(image_port, args.timeout, '/images/' + paths[0])
+
+        n_clients = args.clients + args.image_clients
+        ports = [args.port] * args.clients + [image_port] * args.image_clients
+        client_paths = [None] * args.clients + [paths] * args.image_clients
+        with ProcessPoolExecutor(max_workers=n_clients) as pool:
+            results = list(pool.map(client, ports, [args.duration] * n_clients, range(n_clients), client_paths))
+        n_workers, rss, pss = tree_memory(servers[0].pid)
+    finally:
+        for server in servers:
+            server.send_signal(signal.SIGTERM)
+            server.wait()
+
+    api = results[:args.clients]
+    latencies = np.concatenate([np.asarray(lat) for lat, _ in api]) * 1000
+    return {
+        'workers': n_workers,
+        'rps': len(latencies) / args.duration,
+        'p50': float(np.percentile(latencies, 50)),
+        'p99': float(np.percentile(latencies, 99)),
+        'errors': sum(err for _, err in results),
+        'image_rps': sum(len(lat) for lat, _ in results[args.clients:]) / args.duration,
+        'rss': rss,
+        'idle_pss': idle_pss,
+        'pss': pss,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load-test the production server at several worker counts')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, default=4, help='threads per worker')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent client processes')
+    parser.add_argument('--duration', type=float, default=10, help='seconds of load per worker count')
+    parser.add_argument('--image-clients', type=int, default=0, help='extra clients downloading images')
+    parser.add_argument('--image-server', action='store_true',
+                        help='send the image clients to image_server.py instead of the gunicorn workers')
+    parser.add_argument('--port', type=int, default=5077)
+    parser.add_argument('--web-dir', default=WEB_DIR, help='web/ directory to serve (the dataset is read from ..)')
+    parser.add_argument('--timeout', type=float, default=120, help='seconds to wait for the server to start')
+    args = parser.parse_args()
+
+    print(f"{args.clients} API clients, {args.image_clients} image clients"
+          f"{' (async image server)' if args.image_server else ''}, {args.duration:.0f}s per run, "
+          f"{args.threads} threads per worker")
+    print(f"{'workers':>8}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'img/s':>8}{'errors':>8}"
+          f"{'RSS MB':>9}{'PSS MB':>9}{'idle PSS':>10}")
+    for workers in args.workers:
+        r = run(workers, args)
+        print(f"{r['workers']:>8}{r['rps']:>9.0f}{r['p50']:>9.1f}{r['p99']:>9.1f}{r['image_rps']:>8.0f}{r['errors']:>8}"
+              f"{r['rss'] / 2**20:>9.0f}{r['pss'] / 2**20:>9.0f}{r['idle_pss'] / 2**20:>10.0f}")
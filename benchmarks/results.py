@@ -0,0 +1,62 @@
+import json
+import os
+import platform
+import time
+
+# Benchmark results as JSON files, so runs can be kept and compared: a flat
+# dict of metric name -> number, plus the parameters of the run. Metrics whose
+# name ends in one of HIGHER_IS_BETTER are throughputs; every other metric
+# (seconds, milliseconds, bytes) is better when lower.
+
+HIGHER_IS_BETTER = ('_rps', '_per_s')
+# Changes smaller than this (by unit suffix) are timer noise, never a regression
+NOISE_FLOOR = {'_s': 0.05, '_ms': 0.5}
+
+
+def higher_is_better(name):
+    return name.endswith(HIGHER_IS_BETTER)
+
+
+def noise_floor(name):
+    if higher_is_better(name):
+        return 0
+    return next((floor for suffix, floor in NOISE_FLOOR.items() if name.endswith(suffix)), 0)
+
+
+def write_results(path, benchmark, params, metrics):
+    results = {
+        'benchmark': benchmark,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'host': platform.node(),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+        'params': params,
+        'metrics': metrics,
+    }
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {path}")
+    return results
+
+
+# Print every metric against a baseline results file; returns the metrics that
+# got worse by more than `tolerance` (a fraction of the baseline value)
+def compare(metrics, baseline_path, tolerance=0.1):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"Compared with {baseline_path} ({baseline.get('created_at')}):")
+    print(f"{'metric':<36}{'baseline':>14}{'current':>14}{'change':>10}")
+    regressions = []
+    for name, value in metrics.items():
+        before = baseline['metrics'].get(name)
+        if before is None or value is None:
+            continue
+        change = (value - before) / before if before else (float('inf') if value > before else 0.0)
+        worse = -change if higher_is_better(name) else change
+        flag = ''
+        if worse > tolerance and abs(value - before) > noise_floor(name):
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<36}{before:>14.4g}{value:>14.4g}{change:>+10.1%}{flag}")
+    return regressions
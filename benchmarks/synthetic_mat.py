@@ -0,0 +1,203 @@
+import argparse
+import io
+import os
+import time
+
+import numpy as np
+from scipy.io import savemat
+
+try:
+    from PIL import Image, ImageDraw
+except ImportError:  # Pillow is optional: every image is then a copy of the static placeholder
+    Image = None
+
+# Write a synthetic imdb.mat with the same struct layout as the real dataset:
+# imdb[0][0][k][0] is the k-th field (dob, photo_taken, full_path, gender,
+# name, face_location, face_score, second_face_score, celeb_names, celeb_id).
+# wiki.mat has the same layout without the last two fields.
+#
+# With --fixture DIR it writes a whole dataset directory instead: imdb.mat and
+# wiki.mat where mat_expanded.py looks for them, and a placeholder JPEG for
+# (most of) the crops they list, so the pipeline, the web app and the
+# benchmarks run without the real download.
+
+PLACEHOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'web', 'static', 'placeholder.jpg')
+# Distinct placeholder images; each crop is a copy of one of them
+PLACEHOLDER_VARIANTS = 32
+
+FIRST_NAMES = ['Fred', 'Ginger', 'Marlon', 'Audrey', 'James', 'Grace', 'Cary', 'Greta',
+               'Humphrey', 'Ingrid', 'Charlie', 'Bette', 'Orson', 'Vivien', 'Gene', 'Rita']
+LAST_NAMES = ['Astaire', 'Rogers', 'Brando', 'Hepburn', 'Stewart', 'Kelly', 'Grant', 'Garbo',
+              'Bogart', 'Bergman', 'Chaplin', 'Davis', 'Welles', 'Leigh', 'Kelly', 'Hayworth']
+
+
+def make_celeb_names(count, rng):
+    first = rng.choice(FIRST_NAMES, size=count)
+    last = rng.choice(LAST_NAMES, size=count)
+    return [f"{f} {l} {i}" for i, (f, l) in enumerate(zip(first, last))]
+
+
+def make_imdb_struct(rows, celebs=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    celeb_names = make_celeb_names(celebs, rng)
+
+    # celeb_id is 1-based in the real data, like every MATLAB index
+    celeb_id = rng.integers(1, celebs + 1, size=rows).astype(np.uint16 if celebs < 65536 else np.uint32)
+
+    # Birth dates between 1900 and 2000 as MATLAB datenums, with a few bogus values
+    dob = rng.integers(693962, 730486, size=rows).astype(np.float64)
+    dob[rng.random(rows) < 0.01] = 0
+    dob[rng.random(rows) < 0.005] = np.nan
+    photo_taken = rng.integers(1940, 2016, size=rows).astype(np.uint16)
+
+    gender = rng.integers(0, 2, size=rows).astype(np.float64)
+    gender[rng.random(rows) < 0.02] = np.nan
+
+    face_score = rng.uniform(0.5, 7.0, size=rows)
+    face_score[rng.random(rows) < 0.1] = -np.inf
+    second_face_score = np.full(rows, np.nan)
+    has_second = rng.random(rows) < 0.3
+    second_face_score[has_second] = rng.uniform(0.5, 4.0, size=int(has_second.sum()))
+
+    full_path = np.empty((1, rows), dtype=object)
+    name = np.empty((1, rows), dtype=object)
+    face_location = np.empty((1, rows), dtype=object)
+    boxes = rng.uniform(0, 800, size=(rows, 2))
+    sizes = rng.uniform(40, 400, size=(rows, 1))
+    boxes = np.hstack((boxes, boxes + sizes))
+    missing_name = rng.random(rows) < 0.005
+    for i in range(rows):
+        cid = int(celeb_id[i]) - 1
+        birth_year = 1900 + int((dob[i] - 693962) // 365.25) if dob[i] > 0 else 1900
+        full_path[0, i] = f"{i % 100:02d}/nm{cid:07d}_rm{i:09d}_{birth_year}-1-1_{photo_taken[i]}.jpg"
+        name[0, i] = '' if missing_name[i] else celeb_names[cid]
+        face_location[0, i] = boxes[i:i + 1]
+
+    celeb_cells = np.empty((1, celebs), dtype=object)
+    celeb_cells[0, :] = celeb_names
+
+    # savemat keeps dict insertion order, which fixes the positional field layout
+    return {
+        'dob': dob[None, :],
+        'photo_taken': photo_taken[None, :],
+        'full_path': full_path,
+        'gender': gender[None, :],
+        'name': name,
+        'face_location': face_location,
+        'face_score': face_score[None, :],
+        'second_face_score': second_face_score[None, :],
+        'celeb_names': celeb_cells,
+        'celeb_id': celeb_id[None, :],
+    }
+
+
+def make_wiki_struct(rows, celebs=20000, seed=0):
+    wiki = make_imdb_struct(rows, celebs, seed)
+    del wiki['celeb_names'], wiki['celeb_id']
+    return wiki
+
+
+def write_imdb_mat(path, rows, celebs=20000, seed=0):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    struct = make_imdb_struct(rows, celebs, seed)
+    savemat(path, {'imdb': struct}, do_compression=True)
+    return struct
+
+
+def write_wiki_mat(path, rows, celebs=20000, seed=0):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    struct = make_wiki_struct(rows, celebs, seed)
+    savemat(path, {'wiki': struct}, do_compression=True)
+    return struct
+
+
+# JPEG bytes of a few face-sized placeholders: a shaded background and an oval
+def placeholder_variants(size, count=PLACEHOLDER_VARIANTS, seed=0):
+    if Image is None:
+        with open(PLACEHOLDER, 'rb') as f:
+            return [f.read()]
+    rng = np.random.default_rng(seed)
+    variants = []
+    for _ in range(count):
+        background, face = (tuple(int(c) for c in rng.integers(0, 256, size=3)) for _ in range(2))
+        img = Image.new('RGB', (size, size), background)
+        margin = int(size * rng.uniform(0.15, 0.3))
+        ImageDraw.Draw(img).ellipse((margin, margin // 2, size - margin, size - margin // 2), fill=face)
+        buffer = io.BytesIO()
+        img.save(buffer, 'JPEG', quality=85)
+        variants.append(buffer.getvalue())
+    return variants
+
+
+# Write a placeholder crop for the full_path entries of a struct, under image_dir;
+# a `missing` fraction of them is left out, like crops lost from a partial download
+def write_placeholder_images(struct, image_dir, size=250, missing=0.02, seed=0):
+    rng = np.random.default_rng(seed)
+    variants = placeholder_variants(size, seed=seed)
+    paths = struct['full_path'][0]
+    keep = rng.random(len(paths)) >= missing
+    choice = rng.integers(len(variants), size=len(paths))
+    made = set()
+    written = 0
+    for path, wanted, variant in zip(paths, keep, choice):
+        if not wanted:
+            continue
+        target = os.path.join(image_dir, path)
+        directory = os.path.dirname(target)
+        if directory not in made:
+            os.makedirs(directory, exist_ok=True)
+            made.add(directory)
+        with open(target, 'wb') as f:
+            f.write(variants[variant])
+        written += 1
+    return written
+
+
+# A dataset directory for mat_expanded.py: imdb_crop/imdb.mat, wiki_crop/wiki.mat
+# (when wiki_rows > 0) and their placeholder crops (when images). Parts that
+# exist are kept: the structs are deterministic, so crops can be added later.
+def write_fixture(root, rows, wiki_rows=0, celebs=20000, seed=0, images=True, image_size=250, missing=0.02):
+    sources = [('imdb_crop', 'imdb.mat', make_imdb_struct, write_imdb_mat, rows)]
+    if wiki_rows:
+        sources.append(('wiki_crop', 'wiki.mat', make_wiki_struct, write_wiki_mat, wiki_rows))
+    for i, (directory, filename, make, write, count) in enumerate(sources):
+        path = os.path.join(root, directory, filename)
+        has_images = os.path.isdir(os.path.join(root, directory, '00'))
+        if os.path.exists(path) and (has_images or not images):
+            continue
+        started = time.perf_counter()
+        if os.path.exists(path):
+            struct = make(count, celebs, seed + i)
+        else:
+            struct = write(path, count, celebs, seed + i)
+            print(f"{directory}/{filename}: {count} rows ({time.perf_counter() - started:.1f}s)")
+        if images:
+            started = time.perf_counter()
+            written = write_placeholder_images(struct, os.path.join(root, directory), image_size, missing, seed + i)
+            print(f"{directory}: {written} placeholder images ({time.perf_counter() - started:.1f}s)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic imdb.mat fixture')
+    parser.add_argument('output', nargs='?', default='imdb_crop/imdb.mat')
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--celebs', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--wiki', action='store_true', help='write the wiki.mat layout instead of imdb.mat')
+    parser.add_argument('--fixture', default=None, metavar='DIR',
+                        help='write a dataset directory (.mat files and placeholder crops) instead of one .mat')
+    parser.add_argument('--wiki-rows', type=int, default=0, help='rows of wiki_crop/wiki.mat in a fixture')
+    parser.add_argument('--no-images', action='store_true', help='write the fixture .mat files only')
+    parser.add_argument('--image-size', type=int, default=250, help='side of the placeholder crops in pixels')
+    parser.add_argument('--missing', type=float, default=0.02, help='fraction of crops left out of a fixture')
+    args = parser.parse_args()
+
+    if args.fixture:
+        print(f"Writing a synthetic dataset to {args.fixture}...")
+        write_fixture(args.fixture, args.rows, args.wiki_rows, args.celebs, args.seed,
+                      not args.no_images, args.image_size, args.missing)
+    else:
+        print(f"Writing {args.rows} synthetic rows to {args.output}...")
+        write = write_wiki_mat if args.wiki else write_imdb_mat
+        write(args.output, args.rows, args.celebs, args.seed)
+        print(f"Done ({os.path.getsize(args.output) / 1e6:.1f} MB)")
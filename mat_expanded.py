@@ -1,440 +1,790 @@
+import argparse
+import cProfile
+import datetime as date
+import hashlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import numpy as np
-from scipy.io import loadmat
 import pandas as pd
-import datetime as date
-from dateutil.relativedelta import relativedelta
+import pyarrow as pa
+import pyarrow.parquet as pq
+from scipy.io import loadmat
+
+import mat_stream
+from pipeline_profile import process_peak_rss, profiler
 
 # Define columns for the final output
 cols = ['age', 'gender', 'path', 'name', 'dob', 'photo_taken', 'face_location', 'face_score1', 'face_score2', 'celeb_id']
 
+# Typed dataset layout - the face box is split into four integer columns
+FACE_BOX_COLS = ['face_x1', 'face_y1', 'face_x2', 'face_y2']
+typed_cols = ['age', 'gender', 'path', 'name', 'dob', 'photo_taken'] + FACE_BOX_COLS + ['face_score1', 'face_score2', 'celeb_id']
+
 # Define mat file paths
 imdb_mat = 'imdb_crop/imdb.mat'
-
-# Load .mat files
-print("Loading IMDB dataset...")
-imdb_data = loadmat(imdb_mat)
-
-# Free up memory
-del imdb_mat
-
-# Extract dataset structures
-imdb = imdb_data['imdb']
-
-# Create empty wiki structure to avoid errors
-wiki_data = {'wiki': np.array([[[
-    np.array([[]]), # dob 
-    np.array([[]]), # photo_taken
-    np.array([[]]), # path
-    np.array([[]]), # gender
-    np.array([[]]), # name
-    np.array([[]]), # face_location
-    np.array([[]]), # face_score1
-    np.array([[]]), # face_score2
-    np.array([[]]), # celeb_names
-    np.array([[]]), # celeb_id
-]]])}
-wiki = wiki_data['wiki']
-
-print("WIKI dataset will be skipped as it is not available")
-
-# Print structure information for debugging
-print("IMDB data structure:", imdb.shape)
-print("IMDB[0][0] fields count:", len(imdb[0][0]))
-
-# Extract IMDB fields
-print("Extracting IMDB fields...")
-try:
-    # Print the first field names for debugging
-    field_names = [str(f) for f in imdb[0][0].dtype.names]
-    print(f"IMDB data fields: {field_names}")
-except Exception as e:
-    print(f"Could not extract field names: {e}")
-
-try:
-    imdb_dob = imdb[0][0][0][0]  # date of birth (Matlab serial date number)
-    print(f"DOB field type: {type(imdb_dob)}, shape: {imdb_dob.shape}")
-except Exception as e:
-    print(f"Error extracting DOB field: {e}")
-    imdb_dob = np.array([np.nan] * 10000)  # Create dummy data if extraction fails
-
-imdb_photo_taken = imdb[0][0][1][0]  # year when the photo was taken
-imdb_full_path = imdb[0][0][2][0]  # path to file
-imdb_gender = imdb[0][0][3][0]  # 0 for female and 1 for male, NaN if unknown
-
-# Safely extract remaining fields with error checking
-try:
-    imdb_name = imdb[0][0][4][0]  # name of the celebrity
-    print(f"Successfully extracted imdb_name, length: {len(imdb_name)}")
-except Exception as e:
-    print(f"Error extracting imdb_name: {e}")
-    imdb_name = np.array([["unknown"]] * len(imdb_dob))
-
-try:
-    imdb_face_location = imdb[0][0][5][0]  # location of the face
-    print(f"Successfully extracted imdb_face_location, length: {len(imdb_face_location)}")
-except Exception as e:
-    print(f"Error extracting imdb_face_location: {e}")
-    imdb_face_location = np.array([[0, 0, 0, 0]] * len(imdb_dob))
-
-imdb_face_score1 = imdb[0][0][6][0]  # detector score
-imdb_face_score2 = imdb[0][0][7][0]  # second face detector score
-
-# Safely extract celebrity names and IDs
-try:
-    imdb_celeb_names = imdb[0][0][8][0]  # list of all celebrity names
-    print(f"Successfully extracted imdb_celeb_names, length: {len(imdb_celeb_names)}")
-except Exception as e:
-    print(f"Error extracting imdb_celeb_names: {e}")
-    imdb_celeb_names = np.array([["unknown"]])
-
-try:
-    imdb_celeb_id = imdb[0][0][9][0]  # index of celebrity name
-    print(f"Successfully extracted imdb_celeb_id, length: {len(imdb_celeb_id)}")
-    print(f"Sample imdb_celeb_id types: {type(imdb_celeb_id[0])}")
-except Exception as e:
-    print(f"Error extracting imdb_celeb_id: {e}")
-    imdb_celeb_id = np.array([0] * len(imdb_dob))
-
-# Extract WIKI fields
-print("Extracting WIKI fields...")
-wiki_dob = wiki[0][0][0][0]
-wiki_photo_taken = wiki[0][0][1][0]
-wiki_full_path = wiki[0][0][2][0]
-wiki_gender = wiki[0][0][3][0]
-wiki_face_location = wiki[0][0][5][0]
-wiki_face_score1 = wiki[0][0][6][0]
-wiki_face_score2 = wiki[0][0][7][0]
-
-# Process paths
-imdb_path = []
-wiki_path = []
-
-for path in imdb_full_path:
-    imdb_path.append('imdb_crop/' + path[0])
-
-for path in wiki_full_path:
-    wiki_path.append('wiki_crop/' + path[0])
-
-# Process gender
-imdb_genders = []
-wiki_genders = []
-
-for n in range(len(imdb_gender)):
-    if imdb_gender[n] == 1:
-        imdb_genders.append('male')
-    else:
-        imdb_genders.append('female')
-
-for n in range(len(wiki_gender)):
-    if wiki_gender[n] == 1:
-        wiki_genders.append('male')
-    else:
-        wiki_genders.append('female')
-
-# Process celebrity names
-print("Processing celebrity names...")
-imdb_names = []
-for name in imdb_name:
+wiki_mat = 'wiki_crop/wiki.mat'
+
+# Typed columnar artifact read by the web app
+DATASET_PATH = 'dataset.parquet'
+# Uncompressed Arrow IPC copy that production web workers memory-map and share
+ARROW_PATH = 'dataset.arrow'
+# Per-celebrity aggregates of the dataset, for the browsing API
+CELEBRITIES_PATH = 'celebrities.parquet'
+CELEBRITIES_VERSION = 2  # Bump when the table changes, so cached ones are rebuilt
+CSV_EXPORTS = ('meta_full.csv', 'imdb_meta_full.csv', 'meta.csv')
+
+# Input sources: struct name, .mat path and the prefix for image paths
+SOURCES = [
+    ('imdb', imdb_mat, 'imdb_crop/'),
+    ('wiki', wiki_mat, 'wiki_crop/'),
+]
+SOURCE_NAMES = [name for name, _, _ in SOURCES]
+
+# Fingerprints and per-stage intermediate results
+CACHE_DIR = 'preprocess_cache'
+# Per-stage timing and memory report of the last run, in CACHE_DIR
+PROFILE_REPORT = 'profile.json'
+# Bump when the conversion output changes, so cached stages are rebuilt
+PIPELINE_VERSION = 2
+
+# Streaming mode: rough bytes held per row while a batch is converted and
+# written (Python strings, the typed frame and its Arrow copy)
+DEFAULT_MAX_MEMORY_MB = 512
+BYTES_PER_ROW = 2048
+MIN_BATCH_ROWS = 10000
+# Batch size for the CSV exports outside streaming mode
+DEFAULT_BATCH_ROWS = 200000
+
+# MATLAB datenum 367 is 0001-01-01, which is Python ordinal 1
+MATLAB_DATENUM_OFFSET = 366
+# Python ordinal of 1970-01-01, the epoch of numpy's datetime64
+UNIX_EPOCH_ORDINAL = date.date(1970, 1, 1).toordinal()
+
+# Sanity bounds - anything outside these is treated as unknown
+MIN_DOB_ORDINAL = date.date(1850, 1, 1).toordinal()
+MAX_DOB_ORDINAL = date.date(2025, 12, 31).toordinal()
+MIN_PHOTO_YEAR = 1900  # exclusive
+MAX_PHOTO_YEAR = 2023  # exclusive
+MAX_AGE = 100
+
+
+# Struct fields used by the converter: position in imdb[0][0] and how the field is stored
+MAT_FIELDS = {
+    'dob': (0, 'numeric'),  # date of birth (Matlab serial date number)
+    'photo_taken': (1, 'numeric'),  # year when the photo was taken
+    'full_path': (2, 'text'),  # path to file
+    'gender': (3, 'numeric'),  # 0 for female and 1 for male, NaN if unknown
+    'name': (4, 'text'),  # name of the celebrity
+    'face_location': (5, 'box'),  # location of the face
+    'face_score1': (6, 'numeric'),  # detector score
+    'face_score2': (7, 'numeric'),  # second face detector score
+    'celeb_id': (9, 'numeric'),  # index of celebrity name - only the IMDB struct has it
+}
+# One entry per celebrity rather than per row, indexed by celeb_id (1-based)
+CELEB_NAMES_FIELD = {'celeb_names': (8, 'text')}
+
+
+# Pull the field arrays out of a loaded imdb/wiki struct (imdb[0][0][k][0]),
+# flattening the cell arrays into plain strings and an (n, 4) box array
+def extract_fields(struct):
+    record = struct[0][0]
+    fields = {}
+    for name, (position, kind) in MAT_FIELDS.items():
+        if position >= len(record):
+            continue
+        values = record[position][0]
+        if kind == 'text':
+            with profiler.stage(name, rows=len(values)):
+                values = cell_strings(values)
+        elif kind == 'box':
+            with profiler.stage(name, rows=len(values)):
+                values = cell_boxes(values)
+        fields[name] = values
+    return fields
+
+
+def empty_fields():
+    return {name: np.empty((0, 4)) if kind == 'box' else [] if kind == 'text' else np.empty(0)
+            for name, (_, kind) in MAT_FIELDS.items()}
+
+
+# Each cell of a MATLAB cell array of strings loads as a 1-element array
+def cell_strings(cells):
+    return [c.item() if c.size == 1 else ''.join(c.ravel().tolist()) for c in cells]
+
+
+# Face locations are stored as 1x4 float arrays; unusable cells become NaN rows
+def cell_boxes(cells):
     try:
-        if isinstance(name, np.ndarray) and name.size > 0:
-            if isinstance(name[0], np.ndarray):
-                # Handle case where name is an array of characters
-                try:
-                    imdb_names.append(''.join(char[0] for char in name[0]))
-                except:
-                    imdb_names.append('unknown')
-            else:
-                # Handle case where name[0] is not an array
-                try:
-                    imdb_names.append(str(name[0]))
-                except:
-                    imdb_names.append('unknown')
-        else:
-            # Handle case where name is a scalar
-            try:
-                imdb_names.append(str(name))
-            except:
-                imdb_names.append('unknown')
-    except Exception as e:
-        print(f"Error processing name: {e}, type: {type(name)}")
-        imdb_names.append('unknown')
-
-print(f"Processed {len(imdb_names)} celebrity names")
-
-# Process celebrity IDs
-print("Processing celebrity IDs...")
-imdb_celeb_indices = []
-for i in range(len(imdb_celeb_id)):
+        # Fast path: every cell is the usual 1x4 row
+        boxes = np.concatenate(cells).astype(np.float64)
+        if boxes.shape != (len(cells), 4):
+            raise ValueError(f"unexpected face_location shape {boxes.shape}")
+    except ValueError:
+        boxes = np.full((len(cells), 4), np.nan)
+        sizes = np.fromiter((loc.size for loc in cells), dtype=np.int64, count=len(cells))
+        usable = np.flatnonzero(sizes >= 4)
+        if len(usable):
+            boxes[usable] = np.stack([cells[i].ravel()[:4] for i in usable])
+    return boxes
+
+
+def convert_paths(full_path, prefix):
+    return [prefix + p for p in full_path]
+
+
+def convert_genders(gender):
+    return np.where(np.asarray(gender) == 1, 'male', 'female')
+
+
+def convert_celeb_ids(celeb_id):
+    celeb_id = np.asarray(celeb_id, dtype=np.float64)
+    return np.where(np.isnan(celeb_id), -1, celeb_id).astype(np.int64)
+
+
+# Integer face boxes; missing or non-finite coordinates become 0
+def convert_face_locations(boxes):
+    boxes = np.array(boxes, dtype=np.float64)
+    boxes[~np.isfinite(boxes)] = 0
+    return boxes.astype(np.int64)
+
+
+# Convert MATLAB datenums to datetime64[D], NaT where the date is missing or implausible
+def datenum_to_datetime64(datenum):
+    datenum = np.asarray(datenum, dtype=np.float64)
+    valid = np.isfinite(datenum) & (datenum > 0)
+    ordinals = np.zeros(len(datenum), dtype=np.int64)
+    ordinals[valid] = np.trunc(datenum[valid] - MATLAB_DATENUM_OFFSET).clip(1, MAX_DOB_ORDINAL + 1)
+    valid &= (ordinals >= MIN_DOB_ORDINAL) & (ordinals <= MAX_DOB_ORDINAL)
+
+    dates = np.full(len(datenum), np.datetime64('NaT'), dtype='datetime64[D]')
+    dates[valid] = (ordinals[valid] - UNIX_EPOCH_ORDINAL).astype('datetime64[D]')
+    return dates
+
+
+# Age on January 1st of the year the photo was taken, -1 if unknown or implausible
+def compute_ages(dob, photo_taken):
+    photo_year = np.trunc(np.asarray(photo_taken, dtype=np.float64))
+    known = ~np.isnat(dob) & np.isfinite(photo_year)
+    known &= (photo_year > MIN_PHOTO_YEAR) & (photo_year < MAX_PHOTO_YEAR)
+
+    birth_year = dob.astype('datetime64[Y]').astype(np.int64) + 1970
+    born_jan_1 = dob == dob.astype('datetime64[Y]').astype('datetime64[D]')
+    ages = np.where(known, np.nan_to_num(photo_year) - birth_year - ~born_jan_1, -1).astype(np.int64)
+    ages[(ages < 0) | (ages > MAX_AGE)] = -1
+    return ages
+
+
+# Vectorized conversion of extracted fields into typed output columns
+def convert_fields(fields, path_prefix):
+    n_rows = len(fields['dob'])
+    with profiler.stage('dates', rows=n_rows):
+        dob = datenum_to_datetime64(fields['dob'])
+    with profiler.stage('ages', rows=n_rows):
+        ages = compute_ages(dob, fields['photo_taken'])
+    with profiler.stage('face_boxes', rows=n_rows):
+        face_locations = convert_face_locations(fields['face_location'])
+    return {
+        'age': ages,
+        'gender': convert_genders(fields['gender']),
+        'path': convert_paths(fields['full_path'], path_prefix),
+        'name': fields['name'],
+        'dob': dob,
+        'photo_taken': fields['photo_taken'],
+        'face_location': face_locations,
+        'face_score1': fields['face_score1'],
+        'face_score2': fields['face_score2'],
+        'celeb_id': convert_celeb_ids(fields.get('celeb_id', np.full(len(dob), -1))),
+    }
+
+
+def convert_struct(struct, path_prefix):
+    with profiler.stage('extract'):
+        fields = extract_fields(struct)
+    return convert_fields(fields, path_prefix)
+
+
+# Typed frame for the columnar artifact: real ints, floats and dates instead of text
+def to_typed_frame(columns):
+    photo_taken = np.asarray(columns['photo_taken'], dtype=np.float64)
+    boxes = columns['face_location'].astype(np.int32)
+    frame = pd.DataFrame({
+        'age': np.asarray(columns['age']).astype(np.int16),
+        'gender': pd.Categorical(columns['gender'], categories=['female', 'male']),
+        'path': columns['path'],
+        'name': columns['name'],
+        'dob': columns['dob'],
+        'photo_taken': np.where(np.isfinite(photo_taken), photo_taken, -1).astype(np.int16),
+        'face_score1': np.asarray(columns['face_score1'], dtype=np.float64),
+        'face_score2': np.asarray(columns['face_score2'], dtype=np.float64),
+        'celeb_id': np.asarray(columns['celeb_id']).astype(np.int32),
+    })
+    for i, col in enumerate(FACE_BOX_COLS):
+        frame[col] = boxes[:, i]
+    return frame[typed_cols]
+
+
+# Python's str() of ints and floats matches numpy's text casting, and is faster
+def as_text(values):
+    return list(map(str, np.asarray(values).tolist()))
+
+
+# Render a typed frame in the text layout the CSV files have always used
+def to_text_frame(frame):
+    dob = frame['dob'].to_numpy()
+    formatted_dob = np.where(np.isnat(dob), 'unknown', np.datetime_as_string(dob, unit='D'))
+    face_locs = list(map('{},{},{},{}'.format, *(frame[col].tolist() for col in FACE_BOX_COLS)))
+    return pd.DataFrame({
+        'age': as_text(frame['age']),
+        'gender': frame['gender'].astype(str).to_numpy(),
+        'path': frame['path'].to_numpy(),
+        'name': frame['name'].to_numpy(),
+        'dob': formatted_dob,
+        'photo_taken': as_text(frame['photo_taken']),
+        'face_location': face_locs,
+        'face_score1': as_text(frame['face_score1']),
+        'face_score2': as_text(frame['face_score2']),
+        'celeb_id': as_text(frame['celeb_id']),
+    }, columns=cols)
+
+
+# Write through a temporary file so readers never see a half-written artifact
+def write_dataset(frame, path):
+    tmp_path = path + '.tmp'
+    frame.to_parquet(tmp_path, index=False, compression='zstd')
+    os.replace(tmp_path, path)
+
+
+# Appends batches to a Parquet file one row group at a time; like write_dataset
+# the file only appears under its final name once it is complete
+class DatasetWriter:
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = path + '.tmp'
+        self.writer = None
+        self.rows = 0
+
+    def write_table(self, table):
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.tmp_path, table.schema, compression='zstd')
+        self.writer.write_table(table)
+        self.rows += table.num_rows
+
+    def write_frame(self, frame):
+        self.write_table(pa.Table.from_pandas(frame, preserve_index=False))
+
+    def close(self):
+        if self.writer is None:
+            write_dataset(to_typed_frame(convert_fields(empty_fields(), '')), self.path)
+            return
+        self.writer.close()
+        os.replace(self.tmp_path, self.path)
+
+
+def iter_dataset_frames(path, batch_rows, columns=None):
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_rows, columns=columns):
+        yield batch.to_pandas()
+
+
+# Keep rows with exactly one detected face
+def face_filter(frame):
+    return ((frame['face_score1'] != -np.inf) & frame['face_score2'].isna()).to_numpy()
+
+
+# Shuffle rows that do not fit in memory: scatter them over random bucket
+# files, then shuffle each bucket on its own and concatenate
+class ExternalShuffle:
+    def __init__(self, work_dir, n_buckets):
+        self.work_dir = work_dir
+        self.buckets = [os.path.join(work_dir, f'bucket_{i}.csv') for i in range(n_buckets)]
+        self.rng = np.random.default_rng()
+        os.makedirs(work_dir, exist_ok=True)
+
+    def add(self, frame):
+        assignment = self.rng.integers(len(self.buckets), size=len(frame))
+        for i, bucket in enumerate(self.buckets):
+            frame[assignment == i].to_csv(bucket, mode='a', header=False, index=False)
+
+    def write(self, path, columns):
+        with open(path, 'w', newline='') as out:
+            pd.DataFrame(columns=columns).to_csv(out, index=False)
+            for bucket in self.buckets:
+                if os.path.exists(bucket) and os.path.getsize(bucket):
+                    rows = pd.read_csv(bucket, header=None, names=columns, dtype=str, keep_default_na=False)
+                    rows.sample(frac=1, random_state=self.rng.integers(2**32)).to_csv(out, header=False, index=False)
+        shutil.rmtree(self.work_dir)
+
+
+# CSV exports in the original text layout, written batch by batch from the typed dataset
+def write_csv_exports(dataset_path, batch_rows, work_dir):
+    print("Saving CSV files...")
+    n_rows = pq.ParquetFile(dataset_path).metadata.num_rows
+    shuffle = ExternalShuffle(work_dir, max(1, -(-n_rows // batch_rows)))
+
+    with open('meta_full.csv', 'w', newline='') as meta_full, open('imdb_meta_full.csv', 'w', newline='') as imdb_full:
+        for i, frame in enumerate(iter_dataset_frames(dataset_path, batch_rows)):
+            with profiler.stage('text', rows=len(frame)):
+                final_df = to_text_frame(frame)
+
+            # Filter the data
+            with profiler.stage('filter', rows=len(frame)) as stage:
+                meta = final_df[face_filter(frame)]
+                stage['rows'] = len(meta)
+
+            with profiler.stage('write', rows=len(meta)):
+                # Full dataset with all fields
+                meta.to_csv(meta_full, header=(i == 0), index=False)
+
+                # IMDB-only CSV with all fields
+                final_df[(frame['source'] == 'imdb').to_numpy()].to_csv(imdb_full, header=(i == 0), index=False)
+
+            # Original format rows for backward compatibility, shuffled below
+            with profiler.stage('shuffle', rows=len(meta)):
+                shuffle.add(meta[['age', 'gender', 'path']])
+
+    with profiler.stage('shuffle_write'):
+        shuffle.write('meta.csv', ['age', 'gender', 'path'])
+
+    print("CSV files created:")
+    print("- meta_full.csv (combined IMDB+Wiki with all fields)")
+    print("- imdb_meta_full.csv (IMDB-only with all fields)")
+    print("- meta.csv (original format for compatibility)")
+
+
+# Per-celebrity aggregates of a batch of rows (or of earlier aggregates): photo
+# count, age and photo-year ranges, best face score, and a representative image,
+# the photo with the best face score. Rows without a celeb_id (WIKI) are left out.
+# Names are not aggregated here: see celebrity_names().
+def celebrity_aggregates(frame):
+    grouped = frame.groupby('celeb_id', sort=True)
+    aggregates = pd.DataFrame({
+        'photos': grouped['photos'].sum(),
+        'age_min': grouped['age_min'].min(),
+        'age_max': grouped['age_max'].max(),
+        'year_min': grouped['year_min'].min(),
+        'year_max': grouped['year_max'].max(),
+        'best_face_score': grouped['best_face_score'].max(),
+    })
+    best = frame.sort_values(['celeb_id', 'best_face_score'], ascending=[True, False], kind='stable')
+    best = best.drop_duplicates('celeb_id').set_index('celeb_id')
+    aggregates['image'] = best['image']
+    return aggregates.reset_index()
+
+
+# The columns of celebrity_aggregates for single rows; unknown ages and years are NaN
+def celebrity_rows(frame):
+    frame = frame[(frame['celeb_id'] >= 0).to_numpy()]
+    age = frame['age'].where(frame['age'] >= 0).astype(np.float64)
+    year = frame['photo_taken'].where(frame['photo_taken'] >= 0).astype(np.float64)
+    return pd.DataFrame({
+        'celeb_id': frame['celeb_id'].to_numpy(),
+        'photos': 1,
+        'age_min': age.to_numpy(),
+        'age_max': age.to_numpy(),
+        'year_min': year.to_numpy(),
+        'year_max': year.to_numpy(),
+        'best_face_score': frame['face_score1'].fillna(-np.inf).to_numpy(),
+        'name': frame['name'].to_numpy(),
+        'image': frame['path'].to_numpy(),
+    })
+
+
+# Rows per (celeb_id, name) of a batch, leaving out rows without a name
+def celebrity_name_counts(rows):
+    named = rows[(rows['name'] != '').to_numpy()]
+    return named.groupby(['celeb_id', 'name'], sort=False).size()
+
+
+# The name of every celebrity: the entry of the struct's celeb_names list when
+# there is one, else the most common name on its rows (a row's own name is
+# sometimes empty, so the row with the best face score cannot be trusted)
+def celebrity_names(ids, name_counts, celeb_names=None):
+    counts = name_counts.groupby(level=[0, 1]).sum().sort_index()
+    counts = counts.sort_values(ascending=False, kind='stable').reset_index()
+    names = counts.drop_duplicates('celeb_id').set_index('celeb_id')['name']
+    names = pd.Series(ids).map(names).fillna('').astype(object).to_numpy()
+    if celeb_names:
+        listed = np.asarray(celeb_names + [''], dtype=object)
+        positions = np.where((ids >= 1) & (ids <= len(celeb_names)), ids - 1, len(celeb_names))
+        names = np.where(listed[positions] != '', listed[positions], names)
+    return names
+
+
+# The celeb_names list of the IMDB struct, read without loading the rest of it;
+# None when it cannot be read
+def read_celeb_names(mat_path, spool_dir):
     try:
-        if np.isscalar(imdb_celeb_id[i]):
-            # Handle scalar case
-            val = imdb_celeb_id[i]
-            imdb_celeb_indices.append(int(val) if not np.isnan(val) else -1)
-        else:
-            # Handle array case
-            imdb_celeb_indices.append(-1)
-    except Exception as e:
-        print(f"Error processing celeb_id at index {i}: {e}")
-        imdb_celeb_indices.append(-1)
-
-# Process face locations
-print("Processing face locations...")
-imdb_face_locs = []
-wiki_face_locs = []
-
-for loc in imdb_face_location:
+        count = mat_stream.spool_struct(mat_path, 'imdb', CELEB_NAMES_FIELD, spool_dir)
+        if not count:
+            return None
+        spool = mat_stream.Spool(spool_dir, CELEB_NAMES_FIELD)
+        names = spool.read(0, count)['celeb_names']
+        del spool
+        return names
+    except (OSError, mat_stream.MatStreamError) as e:
+        print(f"Cannot read celeb_names from {mat_path} ({e}), naming celebrities from their rows")
+        return None
+    finally:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+
+
+# Stage: the per-celebrity table, aggregated batch by batch from the typed dataset
+def write_celebrity_table(dataset_path, path, batch_rows, celeb_names=None):
+    columns = ['celeb_id', 'name', 'path', 'age', 'photo_taken', 'face_score1']
+    partial = []
+    name_counts = []
+    for frame in iter_dataset_frames(dataset_path, batch_rows, columns):
+        rows = celebrity_rows(frame)
+        partial.append(celebrity_aggregates(rows))
+        name_counts.append(celebrity_name_counts(rows))
+    if not partial:  # Empty dataset
+        empty = celebrity_rows(pq.read_schema(dataset_path).empty_table().select(columns).to_pandas())
+        partial = [celebrity_aggregates(empty)]
+        name_counts = [celebrity_name_counts(empty)]
+    table = celebrity_aggregates(pd.concat(partial, ignore_index=True))
+    ids = table['celeb_id'].to_numpy().astype(np.int64)
+    table = pd.DataFrame({
+        'celeb_id': table['celeb_id'].astype(np.int32),
+        'name': celebrity_names(ids, pd.concat(name_counts), celeb_names),
+        'photos': table['photos'].astype(np.int32),
+        'age_min': table['age_min'].fillna(-1).astype(np.int16),
+        'age_max': table['age_max'].fillna(-1).astype(np.int16),
+        'year_min': table['year_min'].fillna(-1).astype(np.int16),
+        'year_max': table['year_max'].fillna(-1).astype(np.int16),
+        'best_face_score': table['best_face_score'].astype(np.float64),
+        'image': table['image'].astype(object),
+    })
+    write_dataset(table, path)
+    return len(table)
+
+
+# Resident memory of this process, in bytes
+def current_rss():
     try:
-        # Simplified approach - just extract integers or use zeros
-        if isinstance(loc, np.ndarray) and loc.size >= 4:
-            coords = ["0", "0", "0", "0"]
-            for i in range(4):
-                try:
-                    # Try different approaches to extract the value
-                    if np.isscalar(loc[i]):
-                        coords[i] = str(int(loc[i]))
-                    elif isinstance(loc[i], np.ndarray) and loc[i].size == 1:
-                        coords[i] = str(int(loc[i].flat[0]))
-                    elif hasattr(loc[i], 'tolist'):
-                        value = loc[i].tolist()
-                        if isinstance(value, list) and len(value) == 1:
-                            coords[i] = str(int(value[0]))
-                except:
-                    # Keep default value "0" if extraction fails
-                    pass
-            imdb_face_locs.append(",".join(coords))
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return process_peak_rss()
+
+
+# Rows per batch that fit the memory ceiling on top of what is already resident
+def batch_rows_for(max_memory_mb):
+    budget = max_memory_mb * 2**20 - current_rss()
+    if budget < MIN_BATCH_ROWS * BYTES_PER_ROW:
+        print(f"Warning: {current_rss() / 2**20:.0f} MB is already resident, "
+              f"a {max_memory_mb} MB ceiling leaves room for only the minimum batch size")
+    return max(MIN_BATCH_ROWS, budget // BYTES_PER_ROW)
+
+
+# Content fingerprint of an input file. The stat of the previous run is kept
+# next to the digest, so an untouched file is not read again.
+def file_fingerprint(path, previous=None):
+    stat = os.stat(path)
+    if previous and previous.get('size') == stat.st_size and previous.get('mtime_ns') == stat.st_mtime_ns:
+        return previous
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'digest': digest.hexdigest()}
+
+
+# Hash of everything a stage's output depends on
+def stage_key(*parts):
+    return hashlib.blake2b(json.dumps(parts, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+
+# Manifest of input fingerprints and stage results, stored in the cache directory.
+# A stage is skipped when its key is unchanged and its outputs are still on disk.
+class StageCache:
+    def __init__(self, cache_dir, force=False):
+        self.cache_dir = cache_dir
+        self.force = force
+        self.manifest_path = os.path.join(cache_dir, 'manifest.json')
+        os.makedirs(cache_dir, exist_ok=True)
+        try:
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {}
+        self.manifest.setdefault('inputs', {})
+        self.manifest.setdefault('stages', {})
+
+    def fingerprint(self, path):
+        fingerprint = file_fingerprint(path, self.manifest['inputs'].get(path))
+        self.manifest['inputs'][path] = fingerprint
+        return fingerprint['digest']
+
+    def is_fresh(self, stage, key):
+        record = self.manifest['stages'].get(stage)
+        if self.force or not record or record['key'] != key:
+            return False
+        return all(os.path.exists(p) for p in record['outputs'])
+
+    def record(self, stage, key, outputs, seconds):
+        self.manifest['stages'][stage] = {
+            'key': key,
+            'outputs': outputs,
+            'seconds': round(seconds, 3),
+            'built_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        self.save()
+
+    def save(self):
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+
+# Stage: one .mat file -> typed per-source frame
+def convert_source(name, mat_path, path_prefix):
+    print(f"Loading {name.upper()} dataset from {mat_path}...")
+    with profiler.stage('loadmat'):
+        struct = loadmat(mat_path)[name]
+    print(f"{name.upper()} data fields: {list(struct[0][0].dtype.names or [])}")
+
+    print(f"Converting {name.upper()} fields...")
+    columns = convert_struct(struct, path_prefix)
+    n_rows = len(columns['path'])
+    print(f"Processed {n_rows} rows")
+    print(f"Successfully extracted {int((~np.isnat(columns['dob'])).sum())} dates of birth out of {n_rows}")
+    print(f"Successfully calculated {int((columns['age'] >= 0).sum())} ages out of {n_rows}")
+    with profiler.stage('frame', rows=n_rows):
+        return to_typed_frame(columns)
+
+
+# Stage: one .mat file -> per-source Parquet file, in bounded row batches.
+# The struct is first spooled to disk column by column, then converted and
+# written one batch at a time; the batch shrinks if RSS crosses the ceiling.
+def convert_source_streaming(name, mat_path, path_prefix, output, spool_dir, max_memory_mb, batch_rows=None):
+    print(f"Streaming {name.upper()} dataset from {mat_path}...")
+    with profiler.stage('spool') as stage:
+        n_rows = stage['rows'] = mat_stream.spool_struct(mat_path, name, MAT_FIELDS, spool_dir)
+    spool = mat_stream.Spool(spool_dir, MAT_FIELDS)
+    batch_rows = batch_rows or batch_rows_for(max_memory_mb)
+    print(f"Converting {n_rows} {name.upper()} rows in batches of up to {batch_rows}...")
+
+    writer = DatasetWriter(output)
+    start = 0
+    while start < n_rows:
+        stop = min(n_rows, start + batch_rows)
+        with profiler.stage('read', rows=stop - start):
+            fields = spool.read(start, stop)
+        columns = convert_fields(fields, path_prefix)
+        with profiler.stage('frame', rows=stop - start):
+            frame = to_typed_frame(columns)
+        with profiler.stage('write', rows=stop - start):
+            writer.write_frame(frame)
+        start = stop
+        if current_rss() > max_memory_mb * 2**20 and batch_rows > MIN_BATCH_ROWS:
+            batch_rows = max(MIN_BATCH_ROWS, batch_rows // 2)
+            print(f"RSS above {max_memory_mb} MB, reducing batch size to {batch_rows} rows")
+    with profiler.stage('write'):
+        writer.close()
+
+    del spool
+    shutil.rmtree(spool_dir)
+    print(f"Processed {writer.rows} rows")
+
+
+# Stage worker: convert one source and report how long it took
+def convert_stage(name, mat_path, path_prefix, output, spool_dir, streaming, max_memory_mb, batch_rows):
+    started = time.perf_counter()
+    with profiler.stage(f'convert:{name}'):
+        if streaming:
+            convert_source_streaming(name, mat_path, path_prefix, output, spool_dir, max_memory_mb, batch_rows)
         else:
-            imdb_face_locs.append("0,0,0,0")
-    except Exception as e:
-        print(f"Error processing face location: {e}, type: {type(loc)}")
-        imdb_face_locs.append("0,0,0,0")
-
-for loc in wiki_face_location:
-    try:
-        # Simplified approach - just extract integers or use zeros
-        if isinstance(loc, np.ndarray) and loc.size >= 4:
-            coords = ["0", "0", "0", "0"]
-            for i in range(4):
-                try:
-                    # Try different approaches to extract the value
-                    if np.isscalar(loc[i]):
-                        coords[i] = str(int(loc[i]))
-                    elif isinstance(loc[i], np.ndarray) and loc[i].size == 1:
-                        coords[i] = str(int(loc[i].flat[0]))
-                    elif hasattr(loc[i], 'tolist'):
-                        value = loc[i].tolist()
-                        if isinstance(value, list) and len(value) == 1:
-                            coords[i] = str(int(value[0]))
-                except:
-                    # Keep default value "0" if extraction fails
-                    pass
-            wiki_face_locs.append(",".join(coords))
+            frame = convert_source(name, mat_path, path_prefix)
+            with profiler.stage('write', rows=len(frame)):
+                write_dataset(frame, output)
+    return time.perf_counter() - started
+
+
+# Pool worker: convert one source and send its stage profile back to the parent
+def convert_stage_worker(*job_args):
+    profiler.reset()
+    seconds = convert_stage(*job_args)
+    return seconds, profiler.stages
+
+
+# Convert the sources concurrently, one process each; the wall-clock time is
+# that of the largest source. Streaming mode splits the memory ceiling between them.
+def run_conversions(jobs, cache, args):
+    workers = max(1, min(len(jobs), args.workers or os.cpu_count() or 1))
+    max_memory_mb = args.max_memory // workers
+    job_args = {stage: (name, mat_path, path_prefix, output, os.path.join(args.cache_dir, f'{name}_spool'),
+                        args.streaming, max_memory_mb, args.batch_rows)
+                for stage, key, name, mat_path, path_prefix, output in jobs}
+
+    if workers == 1:
+        for stage, key, *_, output in jobs:
+            cache.record(stage, key, [output], convert_stage(*job_args[stage]))
+        return
+
+    print(f"Converting {', '.join(job[2].upper() for job in jobs)} in {workers} processes...")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(convert_stage_worker, *job_args[job[0]]): job for job in jobs}
+        for future in as_completed(futures):
+            stage, key, *_, output = futures[future]
+            seconds, stages = future.result()
+            profiler.merge(stages)
+            print(f"{stage} finished in {seconds:.1f}s")
+            cache.record(stage, key, [output], seconds)
+
+
+# Stage: write the dataset as a single uncompressed Arrow record batch. Every
+# web worker memory-maps this file, so fixed-width columns are read straight
+# from the shared page cache instead of being copied into each process.
+def write_arrow_artifact(dataset_path, arrow_path):
+    table = pq.read_table(dataset_path).unify_dictionaries().combine_chunks()
+    tmp_path = arrow_path + '.tmp'
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, arrow_path)
+
+
+# Stage: concatenate the per-source files row group by row group, tagging
+# every row with the source it came from
+def merge_sources(source_outputs, path):
+    writer = DatasetWriter(path)
+    for name, source_output in source_outputs:
+        source = pq.ParquetFile(source_output)
+        for i in range(source.num_row_groups):
+            table = source.read_row_group(i)
+            tag = pa.DictionaryArray.from_arrays(pa.array(np.full(table.num_rows, SOURCE_NAMES.index(name), dtype=np.int8)),
+                                                 pa.array(SOURCE_NAMES))
+            writer.write_table(table.append_column('source', tag))
+    writer.close()
+    return writer.rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert the IMDB-WIKI .mat metadata into a typed dataset')
+    parser.add_argument('--csv', action='store_true', help='also write the legacy CSV exports')
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help='directory for fingerprints and per-stage results')
+    parser.add_argument('--force', action='store_true', help='ignore cached results and rebuild every stage')
+    parser.add_argument('--streaming', action='store_true',
+                        help='stream the .mat files in bounded batches instead of loading them whole')
+    parser.add_argument('--max-memory', type=int, default=DEFAULT_MAX_MEMORY_MB, metavar='MB',
+                        help=f'memory ceiling for streaming mode (default {DEFAULT_MAX_MEMORY_MB})')
+    parser.add_argument('--batch-rows', type=int, default=None,
+                        help='rows per batch in streaming mode (default: derived from --max-memory)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='processes for converting sources in parallel (default: one per source, up to the CPU count)')
+    parser.add_argument('--arrow', action='store_true',
+                        help=f'also write {ARROW_PATH}, the memory-mapped dataset for multi-worker serving')
+    parser.add_argument('--profile-report', default=None, metavar='PATH',
+                        help=f'where to write the per-stage timing and memory report (default {CACHE_DIR}/{PROFILE_REPORT})')
+    parser.add_argument('--cprofile', default=None, metavar='PATH',
+                        help='also write cProfile stats to PATH; the sources are then converted in this process')
+    args = parser.parse_args()
+    args.profile_report = args.profile_report or os.path.join(args.cache_dir, PROFILE_REPORT)
+
+    if args.cprofile:
+        # Pool processes would not be profiled
+        args.workers = 1
+        cprofile = cProfile.Profile()
+        cprofile.runcall(run, args)
+        cprofile.dump_stats(args.cprofile)
+        print(f"cProfile stats written to {args.cprofile} (view with: python -m pstats {args.cprofile})")
+    else:
+        run(args)
+
+
+def run(args):
+    cache = StageCache(args.cache_dir, force=args.force)
+
+    # Per-source conversion, keyed on the content of the .mat file
+    source_keys = {}
+    source_outputs = []
+    jobs = []
+    for name, mat_path, path_prefix in SOURCES:
+        if not os.path.exists(mat_path):
+            print(f"{name.upper()} dataset will be skipped as {mat_path} is not available")
+            continue
+        stage = f'convert:{name}'
+        with profiler.stage(f'fingerprint:{name}'):
+            key = stage_key(PIPELINE_VERSION, cache.fingerprint(mat_path))
+        output = os.path.join(args.cache_dir, f'{name}.parquet')
+        if cache.is_fresh(stage, key):
+            print(f"{name.upper()} dataset unchanged, reusing {output}")
         else:
-            wiki_face_locs.append("0,0,0,0")
-    except Exception as e:
-        print(f"Error processing wiki face location: {e}")
-        wiki_face_locs.append("0,0,0,0")
+            jobs.append((stage, key, name, mat_path, path_prefix, output))
+        source_keys[name] = key
+        source_outputs.append((name, output))
 
-print(f"Processed {len(imdb_face_locs)} IMDB face locations")
-print(f"Processed {len(wiki_face_locs)} Wiki face locations")
+    if jobs:
+        run_conversions(jobs, cache, args)
 
-# Convert MATLAB datenum to Python date
-def matlab_datenum_to_datetime(datenum):
-    try:
-        # Check if input is valid
-        if np.isnan(datenum) or datenum <= 0:
-            return None
-            
-        # Explicitly convert numpy types to Python built-ins to avoid type issues
-        datenum_float = float(datenum)
-        
-        # MATLAB datenum starts from 0 at 0000-01-00, while Python's starts from 1 at 0001-01-01
-        # MATLAB datenum 1 corresponds to 0001-01-01 in Python datetime
-        days = datenum_float - 366  # 366 days difference between MATLAB's 0000-01-00 and Python's 0001-01-01
-        
-        # Create the datetime object
-        result_date = date.datetime.fromordinal(max(1, int(days)))
-        
-        # Explicitly convert fractional days to Python float
-        fractional_day = float(days % 1)
-        result_date += date.timedelta(days=fractional_day)
-        
-        # Sanity check - if year is too far in past or future, it's likely wrong
-        if result_date.year < 1850 or result_date.year > 2025:
-            return None
-            
-        return result_date
-    except Exception as e:
-        # Only show a sample of errors to avoid flooding the console
-        if np.random.random() < 0.01:  # Show roughly 1% of errors
-            print(f"Error converting date: {e}, datenum: {datenum}")
-        return None
+    if not source_outputs:
+        raise SystemExit("No .mat files found, nothing to convert")
 
-# Print debugging information about DOB field
-print(f"IMDB DOB field shape: {imdb_dob.shape}")
-print(f"IMDB DOB sample values: {imdb_dob[:5]}")  # Show first 5 values
-
-# Format dates in human-readable format with better debugging
-imdb_formatted_dob = []
-wiki_formatted_dob = []
-dob_success_count = 0
-
-for i, datenum in enumerate(imdb_dob):
-    try:
-        dt = matlab_datenum_to_datetime(datenum)
-        if dt:
-            formatted_date = dt.strftime('%Y-%m-%d')
-            imdb_formatted_dob.append(formatted_date)
-            dob_success_count += 1
+    # Combined dataset, rebuilt only when one of the sources changed
+    dataset_key = stage_key(PIPELINE_VERSION, source_keys)
+    if cache.is_fresh('dataset', dataset_key) and os.path.exists(DATASET_PATH):
+        print(f"{DATASET_PATH} is up to date")
+    else:
+        started = time.perf_counter()
+        print(f"Writing {DATASET_PATH}...")
+        with profiler.stage('dataset') as stage:
+            stage['rows'] = merge_sources(source_outputs, DATASET_PATH)
+        cache.record('dataset', dataset_key, [DATASET_PATH], time.perf_counter() - started)
+
+    # Per-celebrity table, rebuilt with the dataset
+    batch_rows = args.batch_rows or (batch_rows_for(args.max_memory) if args.streaming else DEFAULT_BATCH_ROWS)
+    celebrities_key = stage_key(PIPELINE_VERSION, CELEBRITIES_VERSION, dataset_key)
+    if cache.is_fresh('celebrities', celebrities_key):
+        print(f"{CELEBRITIES_PATH} is up to date")
+    else:
+        started = time.perf_counter()
+        print(f"Writing {CELEBRITIES_PATH}...")
+        with profiler.stage('celebrities') as stage:
+            celeb_names = None
+            if os.path.exists(imdb_mat):
+                with profiler.stage('celeb_names'):
+                    celeb_names = read_celeb_names(imdb_mat, os.path.join(args.cache_dir, 'celeb_names_spool'))
+            stage['rows'] = write_celebrity_table(DATASET_PATH, CELEBRITIES_PATH, batch_rows, celeb_names)
+        print(f"{stage['rows']} celebrities")
+        cache.record('celebrities', celebrities_key, [CELEBRITIES_PATH], time.perf_counter() - started)
+
+    if args.arrow:
+        arrow_key = stage_key(dataset_key)
+        if cache.is_fresh('arrow', arrow_key) and os.path.exists(ARROW_PATH):
+            print(f"{ARROW_PATH} is up to date")
         else:
-            imdb_formatted_dob.append('unknown')
-    except Exception as e:
-        print(f"Error formatting DOB at index {i}: {e}, value: {datenum}")
-        imdb_formatted_dob.append('unknown')
-
-print(f"Successfully extracted {dob_success_count} dates of birth out of {len(imdb_dob)}")
-
-for datenum in wiki_dob:
-    try:
-        dt = matlab_datenum_to_datetime(datenum)
-        if dt:
-            wiki_formatted_dob.append(dt.strftime('%Y-%m-%d'))
+            started = time.perf_counter()
+            print(f"Writing {ARROW_PATH}...")
+            with profiler.stage('arrow'):
+                write_arrow_artifact(DATASET_PATH, ARROW_PATH)
+            cache.record('arrow', arrow_key, [ARROW_PATH], time.perf_counter() - started)
+
+    if args.csv:
+        csv_key = stage_key(dataset_key)
+        if cache.is_fresh('csv', csv_key):
+            print("CSV exports are up to date")
         else:
-            wiki_formatted_dob.append('unknown')
-    except:
-        wiki_formatted_dob.append('unknown')
+            started = time.perf_counter()
+            with profiler.stage('csv'):
+                write_csv_exports(DATASET_PATH, batch_rows, os.path.join(args.cache_dir, 'csv_shuffle'))
+            cache.record('csv', csv_key, list(CSV_EXPORTS), time.perf_counter() - started)
 
-# Calculate ages
-imdb_age = []
-wiki_age = []
-age_success_count = 0
+    print(f"Done! Typed dataset written to {DATASET_PATH}")
+    # Includes the conversions that ran in pool processes (the profiler resets
+    # ru_maxrss between stages, so it keeps the peak itself)
+    peak = profiler.max_peak()
+    print(f"Peak memory: {peak / 2**20:.0f} MB" + (f" (ceiling {args.max_memory} MB)" if args.streaming else ""))
 
-# Print a sample of photo_taken values to debug
-print(f"Sample photo_taken values: {imdb_photo_taken[:5]}")
-print(f"Photo taken type: {type(imdb_photo_taken)}, shape: {imdb_photo_taken.shape}")
+    if profiler.stages:
+        print(profiler.summary())
+    profiler.write(args.profile_report)
+    print(f"Stage profile written to {args.profile_report}")
 
-print("Calculating ages...")
-for i in range(len(imdb_formatted_dob)):
-    try:
-        if imdb_formatted_dob[i] != 'unknown':
-            d1 = date.datetime.strptime(imdb_formatted_dob[i], '%Y-%m-%d')
-            
-            # Convert numpy type to Python type
-            photo_year = int(imdb_photo_taken[i])
-            
-            # Check if photo_taken value is valid
-            if photo_year > 1900 and photo_year < 2023:  # Reasonable year range
-                d2 = date.datetime(year=photo_year, month=1, day=1)
-                diff = d2.year - d1.year
-                
-                # Adjust age if birthday hasn't occurred yet in the photo year
-                if d2.month < d1.month or (d2.month == d1.month and d2.day < d1.day):
-                    diff -= 1
-                
-                # Sanity check - if age is negative or over 100, it's likely wrong
-                if diff < 0 or diff > 100:
-                    diff = -1
-                else:
-                    age_success_count += 1
-            else:
-                diff = -1
-        else:
-            diff = -1
-    except Exception as ex:
-        if i < 5:  # Only show first few errors
-            print(f"Error calculating age at index {i}: {ex}, dob: {imdb_formatted_dob[i]}, photo_year: {imdb_photo_taken[i]}")
-        diff = -1
-    imdb_age.append(diff)
-
-print(f"Successfully calculated {age_success_count} ages out of {len(imdb_formatted_dob)}")
 
-for i in range(len(wiki_formatted_dob)):
-    try:
-        if wiki_formatted_dob[i] != 'unknown':
-            d1 = date.datetime.strptime(wiki_formatted_dob[i], '%Y-%m-%d')
-            
-            # Check if photo_taken value is valid
-            if isinstance(wiki_photo_taken[i], (int, float)) and not np.isnan(wiki_photo_taken[i]) and wiki_photo_taken[i] > 1900:
-                d2 = date.datetime(year=int(wiki_photo_taken[i]), month=1, day=1)
-                rdelta = relativedelta(d2, d1)
-                diff = rdelta.years
-                
-                # Sanity check - if age is negative or over 100, it's likely wrong
-                if diff < 0 or diff > 100:
-                    diff = -1
-            else:
-                diff = -1
-        else:
-            diff = -1
-    except Exception as ex:
-        if i < 10:  # Only show first few errors to avoid flooding
-            print(f"Error calculating wiki age: {ex}")
-        diff = -1
-    wiki_age.append(diff)
-
-# Create placeholder data for missing Wiki fields
-wiki_names = ['unknown'] * len(wiki_age)
-wiki_celeb_indices = [-1] * len(wiki_age)
-
-# Stack the data for IMDB
-print("Creating IMDB dataframe...")
-final_imdb = np.vstack((
-    imdb_age, 
-    imdb_genders, 
-    imdb_path, 
-    imdb_names,
-    imdb_formatted_dob,
-    imdb_photo_taken,
-    imdb_face_locs,
-    imdb_face_score1, 
-    imdb_face_score2,
-    imdb_celeb_indices
-)).T
-
-# Stack the data for Wiki
-print("Creating Wiki dataframe...")
-final_wiki = np.vstack((
-    wiki_age, 
-    wiki_genders, 
-    wiki_path,
-    wiki_names,
-    wiki_formatted_dob,
-    wiki_photo_taken,
-    wiki_face_locs,
-    wiki_face_score1, 
-    wiki_face_score2,
-    wiki_celeb_indices
-)).T
-
-# Create DataFrames
-final_imdb_df = pd.DataFrame(final_imdb)
-final_wiki_df = pd.DataFrame(final_wiki)
-
-# Set column names
-final_imdb_df.columns = cols
-final_wiki_df.columns = cols
-
-# Combine the DataFrames
-print("Combining IMDB and Wiki dataframes...")
-meta = pd.concat((final_imdb_df, final_wiki_df))
-
-# Filter the data
-meta = meta[meta['face_score1'] != '-inf']
-meta = meta[meta['face_score2'] == 'nan']
-
-# Create separate CSV files
-print("Saving CSV files...")
-# Full dataset with all fields
-meta.to_csv('meta_full.csv', index=False)
-
-# Create an IMDB-only CSV with all fields
-final_imdb_df.to_csv('imdb_meta_full.csv', index=False)
-
-# Create original format CSV for backward compatibility
-meta_simplified = meta.drop(['face_score1', 'face_score2', 'name', 'dob', 'photo_taken', 'face_location', 'celeb_id'], axis=1)
-meta_simplified = meta_simplified.sample(frac=1)  # Shuffle the data
-meta_simplified.to_csv('meta.csv', index=False)
-
-print("Done! CSV files created:")
-print("- meta_full.csv (combined IMDB+Wiki with all fields)")
-print("- imdb_meta_full.csv (IMDB-only with all fields)")
-print("- meta.csv (original format for compatibility)")
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+import os
+import struct
+import zlib
+
+import numpy as np
+
+# Streaming reader for the MATLAB v5 .mat files of the IMDB-WIKI dataset.
+#
+# loadmat() materializes the whole struct as nested object arrays. This reader
+# walks the file (decompressing on the fly) and spools each struct field to
+# compact on-disk columns, so the converter can then read bounded row batches:
+#   numeric fields -> <field>.npy
+#   cells of text  -> <field>.txt (NUL-separated UTF-8) + <field>.offsets.npy
+#   cells of boxes -> <field>.npy with shape (rows, 4), NaN where unusable
+
+# Data element types
+MI_INT8, MI_MATRIX, MI_COMPRESSED = 1, 14, 15
+MI_UTF8, MI_UTF16, MI_UTF32 = 16, 17, 18
+MI_DTYPES = {1: 'i1', 2: 'u1', 3: 'i2', 4: 'u2', 5: 'i4', 6: 'u4', 7: 'f4', 9: 'f8', 12: 'i8', 13: 'u8'}
+
+# Array classes
+MX_STRUCT, MX_CHAR = 2, 4
+MX_DTYPES = {6: 'f8', 7: 'f4', 8: 'i1', 9: 'u1', 10: 'i2', 11: 'u2', 12: 'i4', 13: 'u4', 14: 'i8', 15: 'u8'}
+
+# Bytes read from disk / produced by zlib per refill, and cells buffered per spool write
+READ_CHUNK = 1 << 20
+CELL_BATCH = 65536
+
+
+class MatStreamError(ValueError):
+    pass
+
+
+# Sequential byte source over a file region, optionally zlib-compressed
+class _ByteStream:
+    def __init__(self, f, length, compressed):
+        self.f = f
+        self.remaining = length
+        self.inflater = zlib.decompressobj() if compressed else None
+        self.buf = b''
+        self.pos = 0
+        self.consumed = 0
+
+    def _fill(self, n):
+        while len(self.buf) - self.pos < n:
+            if self.inflater is not None and self.inflater.unconsumed_tail:
+                data = self.inflater.unconsumed_tail
+            else:
+                data = self.f.read(min(READ_CHUNK, self.remaining))
+                self.remaining -= len(data)
+                if not data:
+                    raise MatStreamError("unexpected end of .mat data")
+            if self.inflater is not None:
+                data = self.inflater.decompress(data, READ_CHUNK)
+            self.buf = self.buf[self.pos:] + data
+            self.pos = 0
+
+    def read(self, n):
+        self._fill(n)
+        data = self.buf[self.pos:self.pos + n]
+        self.pos += n
+        self.consumed += n
+        return data
+
+    def skip(self, n):
+        # Skip whole buffers at a time so large elements never sit in memory
+        while n > 0:
+            available = len(self.buf) - self.pos
+            if available == 0:
+                self._fill(1)
+                available = len(self.buf) - self.pos
+            step = min(n, available)
+            self.pos += step
+            self.consumed += step
+            n -= step
+
+
+class _Reader:
+    def __init__(self, stream, endian):
+        self.stream = stream
+        self.endian = endian
+        self.pair = struct.Struct(endian + 'II')
+
+    # Returns (type, nbytes, inline data or None); small elements pack into 8 bytes
+    def tag(self):
+        raw = self.stream.read(8)
+        mtype, nbytes = self.pair.unpack(raw)
+        if mtype >> 16:
+            return mtype & 0xFFFF, mtype >> 16, raw[4:4 + (mtype >> 16)]
+        return mtype, nbytes, None
+
+    def element(self):
+        raw = self.stream.read(8)
+        mtype, nbytes = self.pair.unpack(raw)
+        if mtype >> 16:
+            return mtype & 0xFFFF, raw[4:4 + (mtype >> 16)]
+        data = self.stream.read(nbytes)
+        self.stream.skip(-nbytes % 8)
+        return mtype, data
+
+    # Array flags, dimensions and name that open every miMATRIX
+    def matrix_header(self):
+        _, flags = self.element()
+        _, dims = self.element()
+        _, name = self.element()
+        array_class = struct.unpack_from(self.endian + 'I', flags)[0] & 0xFF
+        dims = np.frombuffer(dims, dtype=self.endian + 'i4')
+        return array_class, tuple(int(d) for d in dims), name.decode('ascii', 'replace')
+
+    # Parse a small, fully read miMATRIX body (a single cell) without touching the stream
+    def parse_cell(self, body):
+        pos = 0
+        elements = []
+        while pos < len(body):
+            mtype, nbytes = self.pair.unpack_from(body, pos)
+            if mtype >> 16:
+                nbytes = mtype >> 16
+                elements.append((mtype & 0xFFFF, body[pos + 4:pos + 4 + nbytes]))
+                pos += 8
+            else:
+                elements.append((mtype, body[pos + 8:pos + 8 + nbytes]))
+                pos += 8 + nbytes + (-nbytes % 8)
+        array_class = struct.unpack_from(self.endian + 'I', elements[0][1])[0] & 0xFF
+        return array_class, elements[3:]
+
+    def decode_text(self, mtype, data):
+        if mtype in (MI_UTF8, MI_INT8, 2):
+            return data.decode('utf-8', 'replace')
+        if mtype in (MI_UTF16, 4):
+            return data.decode('utf-16-le' if self.endian == '<' else 'utf-16-be', 'replace')
+        if mtype in (MI_UTF32, 6):
+            return data.decode('utf-32-le' if self.endian == '<' else 'utf-32-be', 'replace')
+        raise MatStreamError(f"unsupported char data type {mtype}")
+
+
+def _spool_numeric(reader, count, array_class, path):
+    mtype, nbytes, inline = reader.tag()
+    source_dtype = np.dtype(reader.endian + MI_DTYPES[mtype])
+    out = np.lib.format.open_memmap(path, mode='w+', dtype=MX_DTYPES[array_class], shape=(count,))
+    if inline is None and nbytes:
+        rows_per_chunk = max(1, READ_CHUNK // source_dtype.itemsize)
+        for start in range(0, count, rows_per_chunk):
+            stop = min(count, start + rows_per_chunk)
+            out[start:stop] = np.frombuffer(reader.stream.read((stop - start) * source_dtype.itemsize), dtype=source_dtype)
+        reader.stream.skip(-nbytes % 8)
+    else:
+        # Tiny vectors may be packed into the tag itself
+        out[:] = np.frombuffer(inline or b'', dtype=source_dtype)
+    out.flush()
+
+
+def _spool_text(reader, count, path):
+    offsets = np.lib.format.open_memmap(path + '.offsets.npy', mode='w+', dtype=np.int64, shape=(count + 1,))
+    offsets[0] = 0
+    written = 0
+    with open(path + '.txt', 'wb') as out:
+        for start in range(0, count, CELL_BATCH):
+            stop = min(count, start + CELL_BATCH)
+            encoded = []
+            for _ in range(start, stop):
+                _, nbytes, _ = reader.tag()
+                text = ''
+                if nbytes:
+                    array_class, data = reader.parse_cell(reader.stream.read(nbytes))
+                    if array_class == MX_CHAR and data:
+                        text = reader.decode_text(*data[0]).replace('\0', '')
+                encoded.append(text.encode('utf-8'))
+            out.write(b'\0'.join(encoded) + b'\0')
+            lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)) + 1
+            offsets[start + 1:stop + 1] = written + np.cumsum(lengths)
+            written = int(offsets[stop])
+    offsets.flush()
+
+
+def _spool_boxes(reader, count, path):
+    out = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64, shape=(count, 4))
+    for start in range(0, count, CELL_BATCH):
+        stop = min(count, start + CELL_BATCH)
+        boxes = np.full((stop - start, 4), np.nan)
+        for i in range(stop - start):
+            _, nbytes, _ = reader.tag()
+            if not nbytes:
+                continue
+            array_class, data = reader.parse_cell(reader.stream.read(nbytes))
+            if array_class in MX_DTYPES and data:
+                mtype, raw = data[0]
+                values = np.frombuffer(raw, dtype=reader.endian + MI_DTYPES[mtype])
+                if values.size >= 4:
+                    boxes[i] = values[:4]
+        out[start:stop] = boxes
+    out.flush()
+
+
+# Walk to the struct variable and spool the requested fields.
+# `fields` maps output name -> (field position in the struct, kind), where kind
+# is 'numeric', 'text' or 'box'. Returns the number of rows.
+def spool_struct(mat_path, var_name, fields, spool_dir):
+    os.makedirs(spool_dir, exist_ok=True)
+    by_position = {position: (name, kind) for name, (position, kind) in fields.items()}
+
+    with open(mat_path, 'rb') as f:
+        header = f.read(128)
+        if len(header) < 128 or header[126:128] not in (b'IM', b'MI'):
+            raise MatStreamError(f"{mat_path} is not a MATLAB v5 .mat file")
+        endian = '<' if header[126:128] == b'IM' else '>'
+        file_size = os.fstat(f.fileno()).st_size
+
+        while f.tell() < file_size:
+            mtype, nbytes = struct.unpack(endian + 'II', f.read(8))
+            element_end = f.tell() + nbytes
+            if mtype not in (MI_MATRIX, MI_COMPRESSED):
+                f.seek(element_end + (-nbytes % 8))
+                continue
+
+            if mtype == MI_COMPRESSED:
+                reader = _Reader(_ByteStream(f, nbytes, compressed=True), endian)
+                mtype, _, _ = reader.tag()
+                if mtype != MI_MATRIX:
+                    f.seek(element_end)
+                    continue
+            else:
+                reader = _Reader(_ByteStream(f, nbytes, compressed=False), endian)
+
+            array_class, dims, name = reader.matrix_header()
+            if name != var_name:
+                f.seek(element_end + (-nbytes % 8 if mtype == MI_MATRIX else 0))
+                continue
+            if array_class != MX_STRUCT or int(np.prod(dims)) != 1:
+                raise MatStreamError(f"'{var_name}' is not a 1x1 struct")
+
+            _, name_length = reader.element()
+            name_length = struct.unpack_from(endian + 'i', name_length)[0]
+            _, names = reader.element()
+            n_fields = len(names) // name_length
+
+            n_rows = None
+            for position in range(n_fields):
+                _, field_bytes, _ = reader.tag()
+                field_start = reader.stream.consumed
+                if position not in by_position or not field_bytes:
+                    reader.stream.skip(field_bytes)
+                    continue
+                out_name, kind = by_position[position]
+                field_class, field_dims, _ = reader.matrix_header()
+                count = int(np.prod(field_dims))
+                n_rows = count if n_rows is None else n_rows
+                if count != n_rows:
+                    raise MatStreamError(f"field {out_name} has {count} rows, expected {n_rows}")
+                path = os.path.join(spool_dir, out_name)
+                if kind == 'numeric':
+                    _spool_numeric(reader, count, field_class, path + '.npy')
+                elif kind == 'text':
+                    _spool_text(reader, count, path)
+                else:
+                    _spool_boxes(reader, count, path + '.npy')
+                reader.stream.skip(field_start + field_bytes - reader.stream.consumed)
+            return n_rows or 0
+
+    raise MatStreamError(f"variable '{var_name}' not found in {mat_path}")
+
+
+# Row-sliced access to the spooled columns
+class Spool:
+    def __init__(self, spool_dir, fields):
+        self.columns = {}
+        for name, (_, kind) in fields.items():
+            path = os.path.join(spool_dir, name)
+            if kind == 'text':
+                offsets = np.load(path + '.offsets.npy', mmap_mode='r')
+                text = np.memmap(path + '.txt', dtype=np.uint8, mode='r') if offsets[-1] else None
+                self.columns[name] = (kind, offsets, text)
+            elif os.path.exists(path + '.npy'):
+                self.columns[name] = (kind, np.load(path + '.npy', mmap_mode='r'), None)
+
+    def read(self, start, stop):
+        batch = {}
+        for name, (kind, data, text) in self.columns.items():
+            if kind == 'text':
+                if stop <= start:
+                    batch[name] = []
+                    continue
+                begin, end = int(data[start]), int(data[stop])
+                batch[name] = text[begin:end - 1].tobytes().decode('utf-8').split('\0')
+            else:
+                batch[name] = np.array(data[start:stop])
+        return batch
@@ -0,0 +1,145 @@
+import json
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager
+
+# Per-stage instrumentation of the conversion pipeline: wall time, CPU time,
+# peak memory and row counts, aggregated by stage name (streaming mode runs the
+# per-batch stages many times) and written out as a JSON report.
+#
+# Stages nest; a nested stage is named '<outer>/<inner>', and the time of an
+# outer stage includes its inner stages. Peak memory is the RSS high-water mark
+# while the stage ran: on Linux the mark is reset when a stage starts (through
+# /proc/self/clear_refs), elsewhere only the process-wide peak is available.
+# The reset also resets ru_maxrss, so the process peak comes from max_peak().
+# Nothing is reset before the first stage starts, so importing this module
+# leaves the process's own peak alone.
+
+REPORT_VERSION = 1
+
+
+def read_hwm():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def reset_hwm():
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def process_peak_rss():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class StageProfiler:
+    def __init__(self):
+        self.stages = {}  # name -> totals, in the order the stages first ran
+        self.stack = []  # [name, running peak] of the stages currently running
+        self.seen_peak = 0  # Highest mark read before a reset
+        self.per_stage_peaks = None  # Decided when the first stage starts
+
+    def start_stage_peaks(self):
+        if self.per_stage_peaks is None:
+            self.seen_peak = max(self.seen_peak, read_hwm() or 0)
+            self.per_stage_peaks = read_hwm() is not None and reset_hwm()
+
+    # Forget the stages recorded so far (a pool worker starts with a copy of its parent's)
+    def reset(self):
+        self.stages = {}
+        self.stack = []
+
+    def peak(self):
+        return read_hwm() if self.per_stage_peaks else process_peak_rss()
+
+    # Peak RSS of the process, including the stages merged from pool workers
+    def max_peak(self):
+        return max([self.seen_peak, self.peak()] + [totals['peak_rss_bytes'] for totals in self.stages.values()])
+
+    # Time a block: `with profiler.stage('dates', rows=n):`. The yielded dict
+    # takes a row count known only at the end: `stage['rows'] = len(frame)`.
+    @contextmanager
+    def stage(self, name, rows=None):
+        if self.stack:
+            name = f"{self.stack[-1][0]}/{name}"
+        self.start_stage_peaks()
+        if self.per_stage_peaks:
+            # Keep the peak so far (of the outer stage, if any), the reset clears it
+            peak = self.peak()
+            self.seen_peak = max(self.seen_peak, peak)
+            if self.stack:
+                self.stack[-1][1] = max(self.stack[-1][1], peak)
+            reset_hwm()
+        frame = [name, 0]
+        self.stack.append(frame)
+        result = {'rows': rows}
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield result
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            peak = max(frame[1], self.peak())
+            self.stack.pop()
+            if self.stack:
+                self.stack[-1][1] = max(self.stack[-1][1], peak)
+            self.add(name, wall, cpu, peak, result['rows'])
+
+    def add(self, name, wall, cpu, peak, rows=None, calls=1):
+        totals = self.stages.setdefault(name, {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0,
+                                               'peak_rss_bytes': 0, 'rows': None})
+        totals['calls'] += calls
+        totals['wall_s'] += wall
+        totals['cpu_s'] += cpu
+        totals['peak_rss_bytes'] = max(totals['peak_rss_bytes'], peak)
+        if rows is not None:
+            totals['rows'] = (totals['rows'] or 0) + rows
+
+    # Stages measured in another process (a pool worker), under a prefix
+    def merge(self, stages, prefix=''):
+        for name, totals in stages.items():
+            self.add(f"{prefix}{name}", totals['wall_s'], totals['cpu_s'], totals['peak_rss_bytes'],
+                     totals['rows'], totals['calls'])
+
+    def report(self):
+        return {
+            'version': REPORT_VERSION,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'pid': os.getpid(),
+            'peak_rss_scope': 'stage' if self.per_stage_peaks else 'process',
+            'stages': [dict(name=name, **{key: round(value, 4) if isinstance(value, float) else value
+                                          for key, value in totals.items()})
+                       for name, totals in self.stages.items()],
+        }
+
+    def write(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def summary(self):
+        lines = [f"{'stage':<40}{'calls':>6}{'wall s':>9}{'cpu s':>9}{'peak MB':>9}{'rows':>11}"]
+        for name, totals in self.stages.items():
+            rows = '' if totals['rows'] is None else totals['rows']
+            lines.append(f"{name:<40}{totals['calls']:>6}{totals['wall_s']:>9.2f}{totals['cpu_s']:>9.2f}"
+                         f"{totals['peak_rss_bytes'] / 2**20:>9.0f}{rows:>11}")
+        return '\n'.join(lines)
+
+
+# The profiler of this process; pool workers report theirs back to the parent
+profiler = StageProfiler()
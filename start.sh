@@ -3,15 +3,24 @@ set -e
 
 cd /workspace/imdb
 
-# Check if the metadata files already exist
-if [ ! -f "meta.csv" ] || [ ! -f "imdb_meta_full.csv" ]; then
-  echo "Processing IMDB dataset to create metadata files..."
-  # Run the processing script
-  python3 mat_expanded.py
-else
-  echo "Metadata files already exist, skipping processing step"
-fi
+# Build or refresh the typed dataset. Stages whose inputs are unchanged
+# (same .mat fingerprint) are skipped, so this is near-instant on restart.
+# Add --csv to also write the legacy CSV exports. --arrow writes the
+# memory-mapped copy of the dataset that the production workers share.
+echo "Processing IMDB/WIKI datasets to create metadata files..."
+python3 mat_expanded.py --arrow
 
 # Change to web directory to run the app
 cd web
-python3 app.py
\ No newline at end of file
+
+# Production: gunicorn workers sharing one preloaded dataset (WEB_WORKERS, WEB_THREADS).
+# WEB_MODE=development runs the single-process Flask debug server instead.
+if [ "${WEB_MODE:-production}" = "development" ]; then
+    python3 app.py
+else
+    # Images from the async image server when the page is told where it is
+    if [ -n "${IMAGE_PUBLIC_URL}" ]; then
+        python3 image_server.py &
+    fi
+    exec gunicorn -c gunicorn.conf.py wsgi:app
+fi
\ No newline at end of file
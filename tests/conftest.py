@@ -0,0 +1,9 @@
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# The conversion scripts live at the top level; the web modules import each
+# other by name and read the dataset from '..'
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'web'))
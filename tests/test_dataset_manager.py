@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+
+from dataset_manager import DatasetManager, DatasetNotReady
+
+# Requests that arrive during the first load wait for it: every waiter must get
+# the dataset once it is built, or the load error if it failed, never a 503 in
+# between.
+
+WAITERS = 16
+
+
+# Lets the woken waiters run before load() goes on, so a dataset assigned after
+# the event is set is seen as missing
+class YieldingEvent(threading.Event):
+    def set(self):
+        super().set()
+        time.sleep(0.01)
+
+
+def manager_for(build):
+    manager = DatasetManager(build, lambda: 'v1')
+    manager.first_load = YieldingEvent()
+    manager.start = lambda: None  # The test drives load() itself
+    return manager
+
+
+def wait_concurrently(manager):
+    results = []
+    ready = threading.Barrier(WAITERS + 1)
+
+    def wait():
+        ready.wait()
+        try:
+            results.append(manager.get(5))
+        except DatasetNotReady as e:
+            results.append(e)
+
+    threads = [threading.Thread(target=wait) for _ in range(WAITERS)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    manager.load()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def slow_build(value):
+    def build():
+        time.sleep(0.01)
+        return value
+    return build
+
+
+@pytest.mark.parametrize('attempt', range(5))
+def test_waiters_get_the_first_dataset(attempt):
+    manager = manager_for(slow_build(attempt))
+    assert wait_concurrently(manager) == [attempt] * WAITERS
+    assert manager.status()['state'] == 'ready'
+
+
+def test_waiters_get_the_load_error():
+    def build():
+        time.sleep(0.01)
+        raise OSError('dataset.parquet is truncated')
+
+    manager = manager_for(build)
+    results = wait_concurrently(manager)
+    assert all(isinstance(result, DatasetNotReady) for result in results)
+    assert all('truncated' in str(result) for result in results)
+    assert manager.status()['state'] == 'failed'
@@ -0,0 +1,97 @@
+import os
+
+import pandas as pd
+import pytest
+
+import app as web_app
+
+# Repeated requests skip the body: a second request with the ETag of the first
+# gets 304 and no body, and the ETag changes with what it validates (the file
+# for /images and /thumbs, the dataset fingerprint for /api/data).
+
+IMAGE = 'imdb_crop/00/nm0000001_rm000000001_1950-1-1_1980.jpg'
+
+
+def write_dataset(root, rows):
+    frame = pd.DataFrame({
+        'age': [30] * rows,
+        'gender': ['female'] * rows,
+        'path': [IMAGE] * rows,
+        'name': [f'Person {i}' for i in range(rows)],
+        'dob': ['1950-01-01'] * rows,
+        'photo_taken': [1980] * rows,
+        'face_location': ['1,2,3,4'] * rows,
+        'face_score1': [4.5] * rows,
+        'face_score2': [float('nan')] * rows,
+        'celeb_id': list(range(1, rows + 1)),
+    })
+    web_app.normalize_legacy_frame(frame).to_parquet(root / 'dataset.parquet')
+
+
+def write_image(root, color):
+    Image = pytest.importorskip('PIL.Image')
+    path = root / IMAGE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new('RGB', (64, 64), color).save(path, 'JPEG')
+
+
+@pytest.fixture
+def dataset_dir(tmp_path, monkeypatch):
+    (tmp_path / 'web').mkdir()
+    write_dataset(tmp_path, 3)
+    write_image(tmp_path, (200, 100, 50))
+    monkeypatch.chdir(tmp_path / 'web')
+    monkeypatch.setattr(web_app, 'thumbnails', web_app.ThumbnailCache('..'))
+    assert web_app.datasets.load()
+    return tmp_path
+
+
+@pytest.fixture
+def client(dataset_dir):
+    return web_app.app.test_client()
+
+
+# Some time passes between writes, so the mtime in the validators changes
+def touch_later(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def assert_not_modified(client, url):
+    first = client.get(url)
+    assert first.status_code == 200
+    assert first.get_data()
+    etag = first.headers['ETag']
+    second = client.get(url, headers={'If-None-Match': etag})
+    assert second.status_code == 304
+    assert second.get_data() == b''
+    return etag
+
+
+def test_image_revalidates_without_body(client, dataset_dir):
+    url = f'/images/{IMAGE}'
+    etag = assert_not_modified(client, url)
+    write_image(dataset_dir, (10, 20, 30))
+    touch_later(dataset_dir / IMAGE)
+    assert client.get(url).headers['ETag'] != etag
+
+
+def test_thumbnail_revalidates_without_body(client, dataset_dir):
+    if not web_app.thumbnails.available:
+        pytest.skip('thumbnails need Pillow')
+    etag = assert_not_modified(client, f'/thumbs/128/{IMAGE}')
+    assert client.get(f'/thumbs/256/{IMAGE}').headers['ETag'] != etag
+
+
+def test_api_data_etag_follows_dataset(client, dataset_dir):
+    url = '/api/data?limit=2'
+    etag = assert_not_modified(client, url)
+    assert client.get('/api/data?limit=1').headers['ETag'] != etag
+
+    write_dataset(dataset_dir, 4)
+    touch_later(dataset_dir / 'dataset.parquet')
+    assert web_app.datasets.load()
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert response.get_json()['total'] == 4
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.io import savemat
+
+import mat_expanded
+
+# The streaming reader (mat_stream.py) must produce the same dataset as
+# loadmat: compressed and uncompressed files, empty name cells, missing or
+# short face boxes, non-ASCII names and the WIKI layout without celeb_id.
+
+ROWS = 23
+NAMES = ['Fred Astaire', '', 'Zoë Saldaña', '李连杰', 'Ginger Rogers']
+
+
+def make_struct(with_celebs):
+    rng = np.random.default_rng(7)
+    dob = rng.integers(693962, 730486, size=ROWS).astype(np.float64)
+    dob[[2, 5]] = [0, np.nan]
+    gender = rng.integers(0, 2, size=ROWS).astype(np.float64)
+    gender[3] = np.nan
+    face_score = rng.uniform(0.5, 7.0, size=ROWS)
+    face_score[4] = -np.inf
+    second_face_score = np.full(ROWS, np.nan)
+    second_face_score[::3] = 1.5
+
+    full_path = np.empty((1, ROWS), dtype=object)
+    name = np.empty((1, ROWS), dtype=object)
+    face_location = np.empty((1, ROWS), dtype=object)
+    for i in range(ROWS):
+        full_path[0, i] = f"{i % 4:02d}/nm{i:07d}_rm{i:09d}_1950-1-1_1980.jpg"
+        name[0, i] = NAMES[i % len(NAMES)]
+        face_location[0, i] = np.array([[10.5 + i, 20.0, 110.0, 120.25]])
+    face_location[0, 6] = np.empty((0, 0))  # No face box
+    face_location[0, 7] = np.array([[1.0, 2.0]])  # Too short to use
+
+    struct = {
+        'dob': dob[None, :],
+        'photo_taken': rng.integers(1940, 2016, size=ROWS).astype(np.uint16)[None, :],
+        'full_path': full_path,
+        'gender': gender[None, :],
+        'name': name,
+        'face_location': face_location,
+        'face_score': face_score[None, :],
+        'second_face_score': second_face_score[None, :],
+    }
+    if with_celebs:
+        celeb_names = np.empty((1, 3), dtype=object)
+        celeb_names[0, :] = ['Fred Astaire', 'Zoë Saldaña', 'Ginger Rogers']
+        struct['celeb_names'] = celeb_names
+        struct['celeb_id'] = (np.arange(ROWS) % 3 + 1).astype(np.uint16)[None, :]
+    return struct
+
+
+@pytest.mark.parametrize('compressed', [True, False])
+@pytest.mark.parametrize('name', ['imdb', 'wiki'])
+def test_streaming_matches_loadmat(tmp_path, compressed, name):
+    mat_path = str(tmp_path / f'{name}.mat')
+    savemat(mat_path, {name: make_struct(name == 'imdb')}, do_compression=compressed)
+
+    # Both through Parquet, which stores the dates at its own resolution
+    loaded = str(tmp_path / f'{name}_loadmat.parquet')
+    mat_expanded.write_dataset(mat_expanded.convert_source(name, mat_path, f'{name}_crop/'), loaded)
+    expected = pd.read_parquet(loaded)
+    output = str(tmp_path / f'{name}.parquet')
+    # Batches smaller than the file, so rows are read across batch boundaries
+    mat_expanded.convert_source_streaming(name, mat_path, f'{name}_crop/', output, str(tmp_path / 'spool'),
+                                          max_memory_mb=1024, batch_rows=5)
+    streamed = pd.read_parquet(output)
+
+    pd.testing.assert_frame_equal(streamed, expected)
+    assert streamed['name'].tolist() == [NAMES[i % len(NAMES)] for i in range(ROWS)]
+    assert streamed.loc[6, mat_expanded.FACE_BOX_COLS].tolist() == streamed.loc[7, mat_expanded.FACE_BOX_COLS].tolist()
+    assert not (tmp_path / 'spool').exists()
+
+
+def test_celeb_names_are_read_without_the_rows(tmp_path):
+    mat_path = str(tmp_path / 'imdb.mat')
+    savemat(mat_path, {'imdb': make_struct(True)}, do_compression=True)
+    names = mat_expanded.read_celeb_names(mat_path, str(tmp_path / 'spool'))
+    assert names == ['Fred Astaire', 'Zoë Saldaña', 'Ginger Rogers']
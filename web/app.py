@@ -1,10 +1,27 @@
 import os
+import base64
+import binascii
+import hashlib
 import pandas as pd
 import numpy as np
 import json
 import math
-from flask import Flask, render_template, request, jsonify, send_from_directory
-from functools import lru_cache
+import time
+from flask import Flask, render_template, request, jsonify, send_file, abort, g, has_request_context
+from functools import wraps
+from urllib.parse import parse_qsl, urlencode
+from werkzeug.security import safe_join
+
+from celebrity_index import CELEBRITY_SORTS, CelebrityIndex
+from dataset_manager import DatasetManager, DatasetNotReady
+from result_cache import ResultCache
+from facet_index import FacetIndex, intersect, positions_predicate
+from file_index import FileIndex
+from metrics import MetricsRegistry, gauge_lines, request_metrics
+from search_index import NameIndex
+from serialize import encode_columns, encode_envelope, encode_records
+from sprites import SPRITE_MAX_TILES, SPRITE_SIZES, SpriteCache, sprite_layout
+from thumbnails import THUMB_SIZES, ThumbnailCache
 
 # Custom JSON encoder to handle NaN, NaT, Infinity and other non-JSON serializable values
 class CustomJSONEncoder(json.JSONEncoder):
@@ -22,36 +39,367 @@ app = Flask(__name__)
 app.json_encoder = CustomJSONEncoder
 
 # Configuration
+DATASET_PATH = '../dataset.parquet'  # Typed columnar dataset written by mat_expanded.py
+ARROW_PATH = '../dataset.arrow'  # Memory-mapped copy for multi-worker serving (mat_expanded.py --arrow)
+CELEBRITIES_PATH = '../celebrities.parquet'  # Per-celebrity aggregates written by mat_expanded.py
 CSV_PATH = '../meta.csv'  # Path to the metadata CSV file - fallback to simpler version if full version not available
 IMAGE_DIR = '../imdb_crop'  # Path to the image directory
+IMAGE_ROOT = '..'  # Dataset image paths are relative to this directory
+IMAGE_DIRS = ['imdb_crop', 'wiki_crop']  # Crop directories indexed at startup, relative to IMAGE_ROOT
+IMAGE_MANIFEST = '../preprocess_cache/image_index.json'  # Cached listing of the crop directories
+# Where the page loads images from: '' for this app, a URL, or ':<port>' for the
+# async image server (image_server.py) on the same host
+IMAGE_PUBLIC_URL = os.environ.get('IMAGE_PUBLIC_URL', '')
 
 # Check if the full version exists and use it if available
 if os.path.exists('../imdb_meta_full.csv'):
     CSV_PATH = '../imdb_meta_full.csv'
 
-# Load the data with caching
-@lru_cache(maxsize=1)
+# Filtered result sets kept for infinite scroll: entry count, total size of the
+# cached position arrays, and how long an entry lives (seconds)
+RESULT_CACHE_ENTRIES = 256
+RESULT_CACHE_BYTES = 64 * 2**20
+RESULT_CACHE_TTL = 300
+
+result_cache = ResultCache(RESULT_CACHE_ENTRIES, RESULT_CACHE_BYTES, RESULT_CACHE_TTL)
+
+# Request metrics for /metrics, shared by all worker processes. Routes are
+# declared once they all exist (see the end of this file).
+metrics = MetricsRegistry()
+# Steps inside the routes: index lookups, gathering the page rows, JSON encoding,
+# sending files (up to the last byte, under gunicorn), making thumbnails
+REQUEST_STAGES = ('filter', 'slice', 'serialize', 'send_file', 'thumbnail', 'sprite')
+# WSGI environ key: when send_immutable started sending a file
+SEND_STARTED = 'imdb.send_started'
+stage_seconds = metrics.histogram('imdb_request_stage_seconds', 'Time spent in one step of handling a request',
+                                  ('stage',), [(stage,) for stage in REQUEST_STAGES])
+
+# How often (seconds) the dataset files are checked for a new version, and how
+# long a request waits for the first load before getting a 503
+DATASET_POLL_INTERVAL = float(os.environ.get('DATASET_POLL_INTERVAL', 5))
+DATASET_WAIT = 60
+
+# HTTP caching: crops never change once written, API pages only change with the dataset
+IMAGE_MAX_AGE = 365 * 24 * 3600
+API_MAX_AGE = 60
+
+# Thumbnails of the crops, made on first request; dataset paths are relative to the parent directory
+thumbnails = ThumbnailCache('..')
+
+# Contact sheets of whole grid pages (/api/sprite), composed in the background
+sprites = SpriteCache('..')
+SPRITE_TILE = 128  # Default cell size
+SPRITE_WAIT = 30  # Seconds a sheet request waits for its composition
+
+# Most paths one /api/images/exists call checks
+EXISTS_BATCH_MAX = 10000
+
+# Most suggestions one /api/names call returns
+NAMES_LIMIT_MAX = 1000
+
+# Most celebrities or photos one /api/celebrities page returns
+CELEBRITIES_LIMIT_MAX = 1000
+
+# The face box is stored as four integer columns in the typed dataset
+FACE_BOX_COLS = ['face_x1', 'face_y1', 'face_x2', 'face_y2']
+
+# Convert a legacy text CSV into the typed layout of dataset.parquet
+def normalize_legacy_frame(df):
+    df = df.copy()
+    for col, default in (('age', -1), ('photo_taken', -1), ('celeb_id', -1)):
+        values = pd.to_numeric(df[col], errors='coerce') if col in df else pd.Series(default, index=df.index)
+        df[col] = values.fillna(default).astype('int32')
+    for col in ('face_score1', 'face_score2'):
+        df[col] = pd.to_numeric(df[col], errors='coerce') if col in df else np.nan
+    df['name'] = df['name'].fillna('') if 'name' in df else ''
+    df['dob'] = pd.to_datetime(df['dob'], errors='coerce') if 'dob' in df else pd.NaT
+    boxes = df.pop('face_location').fillna('0,0,0,0').str.split(',', expand=True) if 'face_location' in df else None
+    for i, col in enumerate(FACE_BOX_COLS):
+        df[col] = pd.to_numeric(boxes[i], errors='coerce').fillna(0).astype('int32') if boxes is not None else 0
+    return df
+
+# Cheap version of a file for validators: modification time and size
+def file_version(path):
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+# One loaded version of the dataset with everything derived from it: the image
+# file index (rebuilt incrementally from the manifest), the rows flagged by
+# whether their image exists, the name search and filter indexes, the name list
+# and the per-celebrity table
+class Dataset:
+    def __init__(self):
+        self.image_index = FileIndex(IMAGE_ROOT, IMAGE_DIRS, IMAGE_MANIFEST).build()
+        self.df = read_dataset()
+        if 'path' in self.df:
+            self.df['has_image'] = self.image_index.contains_many(self.df['path'].tolist())
+            self.df.attrs['fingerprint'] += '-' + self.image_index.version
+        self.search_index = NameIndex(self.df['name'])
+        self.facet_index = FacetIndex(self.df)
+        # The search index already holds the distinct names
+        self.unique_names = sorted(name for name in self.search_index.names if name)
+        self.celebrities = read_celebrities(self.facet_index)
+        if self.celebrities is not None and self.df.attrs.get('fingerprint'):
+            self.df.attrs['fingerprint'] += '-' + file_version(CELEBRITIES_PATH)
+        self.fingerprint = self.df.attrs.get('fingerprint')
+
+# The per-celebrity table, or None when it has not been generated (or lacks the
+# celeb_id column to browse by)
+def read_celebrities(facet_index):
+    if not os.path.exists(CELEBRITIES_PATH) or 'celeb_id' not in facet_index.groups:
+        return None
+    try:
+        return CelebrityIndex(pd.read_parquet(CELEBRITIES_PATH), facet_index.groups['celeb_id'])
+    except Exception as e:
+        print(f"Error loading {CELEBRITIES_PATH}: {e}")
+        return None
+
+# Versions of the files read_dataset() may read, to notice a regenerated dataset
+def dataset_sources():
+    return tuple(file_version(path) if os.path.exists(path) else None
+                 for path in (ARROW_PATH, DATASET_PATH, CSV_PATH, CELEBRITIES_PATH))
+
+# Filtered results of an old version must not be served for the new one
+datasets = DatasetManager(Dataset, dataset_sources, DATASET_POLL_INTERVAL,
+                          on_swap=[lambda dataset: result_cache.clear()])
+
+# The dataset version of the current request: pinned on first use, so a swap in
+# the middle of a request cannot mix rows of one version with indexes of another
+def current_dataset():
+    if not has_request_context():
+        return datasets.get(DATASET_WAIT)
+    if 'dataset' not in g:
+        g.dataset = datasets.get(DATASET_WAIT)
+    return g.dataset
+
+def load_image_index():
+    return current_dataset().image_index
+
 def load_data():
+    return current_dataset().df
+
+# Memory-map the Arrow artifact: fixed-width columns and pyarrow-backed strings
+# stay views of the mapped file, which every worker process shares
+def read_arrow_dataset(path):
+    import pyarrow as pa
+    string_types = (pa.string(), pa.large_string())
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    return table.to_pandas(split_blocks=True,
+                           types_mapper=lambda t: pd.StringDtype('pyarrow') if t in string_types else None)
+
+# Read the dataset - prefer the memory-mapped artifact when it is at least as new
+# as the typed dataset, then the typed dataset, then the CSV exports
+def read_dataset():
     try:
-        df = pd.read_csv(CSV_PATH)
+        if os.path.exists(ARROW_PATH) and (not os.path.exists(DATASET_PATH)
+                                           or os.path.getmtime(ARROW_PATH) >= os.path.getmtime(DATASET_PATH)):
+            try:
+                fingerprint = file_version(ARROW_PATH)
+                df = read_arrow_dataset(ARROW_PATH)
+                df.attrs['fingerprint'] = fingerprint
+                return df
+            except ImportError as e:
+                print(f"Cannot read {ARROW_PATH} ({e}), falling back to {DATASET_PATH}")
+        if os.path.exists(DATASET_PATH):
+            try:
+                fingerprint = file_version(DATASET_PATH)
+                df = pd.read_parquet(DATASET_PATH)
+                df.attrs['fingerprint'] = fingerprint
+                return df
+            except ImportError as e:
+                print(f"Cannot read {DATASET_PATH} ({e}), falling back to {CSV_PATH}")
+        fingerprint = file_version(CSV_PATH)
+        df = normalize_legacy_frame(pd.read_csv(CSV_PATH))
+        df.attrs['fingerprint'] = fingerprint
         return df
     except Exception as e:
         print(f"Error loading data: {e}")
         return pd.DataFrame()
 
-# Get unique celebrity names from the dataset
-def get_unique_names():
+# Name search index, built once per loaded dataset
+def load_search_index():
+    return current_dataset().search_index
+
+# Filter indexes (age, gender, photo year, face score, celebrity), built once per loaded dataset
+def load_facet_index():
+    return current_dataset().facet_index
+
+# Normalize a search term
+def search_key(search):
+    return ' '.join(search.lower().split())
+
+# Normalize the search term, filters and sort order of a request into its result
+# cache key, a canonical query string ('' for all rows in dataset order)
+def query_key(args):
+    search = search_key(args.get('search', ''))
+    filters = load_facet_index().parse(args)
+    return urlencode(([('search', search)] if search else []) + filters)
+
+# A query key that came back from a client (in a cursor or a sprite URL) must be
+# one query_key() produces, so it parses and cannot fill the cache with variants
+def check_query_key(key):
+    if query_key(dict(parse_qsl(key))) != key:
+        raise ValueError(f"Invalid query: {key}")
+    return key
+
+# Row positions matching a query key, cached so later pages of the same query are a slice.
+# The key includes the dataset version, so a result computed during a swap is never reused.
+def query_positions(key):
+    cache_key = (current_dataset().fingerprint, key)
+    positions = result_cache.get(cache_key)
+    if positions is None:
+        positions = filter_positions(key)
+        # None (every row, in row order) is not worth caching, and put() needs an array
+        if positions is not None:
+            result_cache.put(cache_key, positions)
+    return positions
+
+# Intersect the name search with the filter indexes, most selective first, then
+# order the result through the precomputed sort permutations
+def filter_positions(key):
+    params = parse_qsl(key)
+    facet_index = load_facet_index()
+    predicates = facet_index.predicates(params)
+    params = dict(params)
+    if params.get('search'):
+        predicates.append(positions_predicate(load_search_index().search(params['search'])))
+    positions = intersect(predicates) if predicates else None
+    if params.get('sort'):
+        positions = facet_index.sorts[params['sort']].sort(positions, params['order'])
+    return positions
+
+# One page of a query, from a cursor or from the query parameters and a page number:
+# (page rows, query key, start and end offsets in the result, total, page number).
+# Raises ValueError for an invalid cursor, filter or sort.
+def query_page(args, limit):
     df = load_data()
-    # Get unique non-null names and sort alphabetically
-    names = df['name'].dropna().unique().tolist()
-    return sorted(names)
+    
+    # A cursor carries the query and its total; otherwise start a query at the requested page
+    cursor = args.get('cursor')
+    if cursor:
+        start, key, total = decode_cursor(cursor)
+        check_query_key(key)
+        page = start // limit + 1
+    else:
+        page = int(args.get('page', 1))
+        key = query_key(args)
+        start = max(page - 1, 0) * limit
+        total = None
+    
+    # Apply the name search (case-insensitive substring) and filters through their indexes
+    with stage_seconds.timer('filter'):
+        positions = query_positions(key) if key else None
+    if total is None:
+        total = len(df) if positions is None else len(positions)
+    
+    # Pages past the end are empty rather than wrapping around to the first page
+    end = min(start + limit, total)
+    start = min(start, end)
+    
+    # Get the paginated rows - only the page rows are gathered
+    with stage_seconds.timer('slice'):
+        rows = page_frame(df.iloc[start:end] if positions is None else df.iloc[positions[start:end]])
+    return rows, key, start, end, total, page
+
+# Opaque pagination cursor: the next row offset in the result set of a query,
+# with the query key and its total so later pages neither refilter nor recount
+def encode_cursor(offset, key, total):
+    state = json.dumps({'o': offset, 'q': key, 'n': total}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(state.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        offset, key, total = int(state['o']), str(state['q']), int(state['n'])
+    except (binascii.Error, ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if offset < 0 or total < 0:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return offset, key, total
+
+# Shape a page of typed rows into the fields the frontend expects
+def page_frame(df_page):
+    page = df_page.drop(columns=FACE_BOX_COLS)
+    boxes = zip(*(df_page[col].tolist() for col in FACE_BOX_COLS))
+    page['face_location'] = ['{},{},{},{}'.format(*box) for box in boxes]
+    return page
+
+# Get unique celebrity names from the dataset, sorted once per loaded dataset
+def get_unique_names():
+    return current_dataset().unique_names
+
+# Conditional GET for API views whose response depends only on the dataset and the
+# query string: the ETag is derived from both, and a matching If-None-Match gets
+# a 304 before the view runs
+def dataset_cached(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        fingerprint = load_data().attrs.get('fingerprint')
+        if not fingerprint:
+            return view(*args, **kwargs)
+        query = urlencode(sorted(request.args.items(multi=True)))
+        etag = hashlib.blake2b(f"{fingerprint}|{request.path}|{query}".encode('utf-8'), digest_size=12).hexdigest()
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+        else:
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = API_MAX_AGE
+        return response
+    return wrapper
+
+# Send a file that never changes under its URL: validators from its mtime and size,
+# and a long-lived immutable Cache-Control so the browser does not even revalidate
+def send_immutable(directory, filename, mimetype=None):
+    path = safe_join(directory, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    # The body is sent after the view returns, so the server records the step
+    # once the last byte is out (record_file_sent, from gunicorn's post_request)
+    request.environ[SEND_STARTED] = time.perf_counter()
+    response = send_file(os.path.abspath(path), mimetype=mimetype, etag=file_version(path), max_age=IMAGE_MAX_AGE)
+    response.cache_control.immutable = True
+    return response
+
+# Werkzeug sends files with direct_passthrough, which skips the response's
+# call_on_close callbacks, so the send_file step is recorded by the server
+def record_file_sent(environ):
+    started = environ.get(SEND_STARTED)
+    if started is not None:
+        stage_seconds.observe(time.perf_counter() - started, 'send_file')
+
+# Per-route latency and response counts
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    started = g.get('request_started')
+    if started is not None:
+        route = request.endpoint if (request.endpoint,) in request_seconds.offsets else 'unmatched'
+        request_seconds.observe(time.perf_counter() - started, route)
+        requests_total.inc(route, f'{response.status_code // 100}xx')
+    return response
+
+# Requests that need the dataset before its first load has finished
+@app.errorhandler(DatasetNotReady)
+def dataset_not_ready(e):
+    response = jsonify({'error': str(e), 'status': datasets.status()})
+    response.status_code = 503
+    response.headers['Retry-After'] = '5'
+    return response
 
 # Routes
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return render_template('index.html', image_base=IMAGE_PUBLIC_URL)
 
 @app.route('/api/unique-names')
+@dataset_cached
 def unique_names():
     try:
         names = get_unique_names()
@@ -67,54 +415,47 @@ def unique_names():
             'count': 0
         }), 500
 
+# Autocomplete: names starting with a prefix (case-insensitive), with their photo counts
+@app.route('/api/names')
+@dataset_cached
+def complete_names():
+    try:
+        prefix = request.args.get('prefix', '').strip()
+        limit = min(max(int(request.args.get('limit', 50)), 0), NAMES_LIMIT_MAX)
+        names, total = load_search_index().complete(prefix, limit)
+        return jsonify({
+            'names': [{'name': name, 'count': count} for name, count in names],
+            'total': total
+        })
+    except Exception as e:
+        print(f"Error completing names: {e}")
+        return jsonify({
+            'error': str(e),
+            'names': [],
+            'total': 0
+        }), 500
+
 @app.route('/api/data')
+@dataset_cached
 def get_data():
     try:
-        page = int(request.args.get('page', 1))
-        limit = int(request.args.get('limit', 20))
-        search = request.args.get('search', '').strip()
-        
-        df = load_data()
+        limit = max(int(request.args.get('limit', 20)), 1)
+        try:
+            rows, key, start, end, total, page = query_page(request.args, limit)
+        except ValueError as e:
+            return jsonify({'error': str(e), 'data': [], 'total': 0, 'limit': limit}), 400
         
-        # Apply search filter if provided
-        if search:
-            # Make search case-insensitive and handle NaN values
-            mask = df['name'].fillna('').str.lower().str.contains(search.lower())
-            df = df[mask]
-        
-        # Calculate pagination
-        start = (page - 1) * limit
-        end = start + limit
-        
-        # Safety check on dataframe size
-        if start >= len(df):
-            start = 0
-            end = min(limit, len(df))
-        
-        # Get paginated data and handle problematic values
-        df_page = df.iloc[start:end].copy()
-        
-        # Replace problematic values
-        replacements = {
-            np.nan: None,
-            np.inf: None,
-            -np.inf: None
-        }
-        
-        # Apply replacements to all fields that could have issues
-        for col in df_page.select_dtypes(include=['float', 'int']).columns:
-            df_page[col] = df_page[col].replace(replacements)
-        
-        # Convert to records (serializable format)
-        data = df_page.to_dict(orient='records')
-        total = len(df)
-        
-        return jsonify({
-            'data': data,
-            'total': total,
-            'page': page,
-            'limit': limit
-        })
+        # Encode straight from the column arrays; format=columns returns one array per field
+        encode = encode_columns if request.args.get('format') == 'columns' else encode_records
+        with stage_seconds.timer('serialize'):
+            body = encode_envelope(
+                encode(rows),
+                total=total,
+                page=page,
+                limit=limit,
+                next_cursor=encode_cursor(end, key, total) if end < total else None
+            )
+        return app.response_class(body, mimetype='application/json')
     except Exception as e:
         # Log the error and return a meaningful error response
         print(f"Error in get_data: {str(e)}")
@@ -123,31 +464,279 @@ def get_data():
             'data': [],
             'total': 0,
             'page': 1,
-            'limit': 20
+            'limit': 20,
+            'next_cursor': None
         }), 500
 
+# Name of the contact sheet of rows [start, end) of a query; it changes with the dataset
+def sprite_name(key, start, end, size):
+    state = f"{current_dataset().fingerprint}|{key}|{start}|{end}|{size}"
+    return hashlib.blake2b(state.encode('utf-8'), digest_size=16).hexdigest()
+
+# Image paths of the tiles of some rows, None where the image is missing
+def tile_paths(rows):
+    has_image = rows['has_image'].tolist() if 'has_image' in rows else [True] * len(rows)
+    return [path if exists else None for path, exists in zip(rows['path'].tolist(), has_image)]
+
+# Tiles of rows [start, end) of a query
+def range_tile_paths(key, start, end):
+    df = load_data()
+    positions = query_positions(key) if key else None
+    return tile_paths(df.iloc[start:end] if positions is None else df.iloc[positions[start:end]])
+
+# Sheet URL and layout for a page of rows, starting its composition in the background.
+# Rows without an image get no tile (null) and keep an empty cell.
+def page_sprite(rows, key, start, end, size):
+    name = sprite_name(key, start, end, size)
+    paths = tile_paths(rows)
+    sprites.prepare(size, name, paths)
+    layout = sprite_layout(len(rows), size)
+    layout['tiles'] = [tile if path else None for tile, path in zip(layout['tiles'], paths)]
+    layout['url'] = f"/sprites/{size}/{name}.jpg?{urlencode({'q': key, 'start': start, 'end': end})}"
+    return layout
+
+# A page of /api/data plus one contact sheet of its tiles: the response is the
+# /api/data envelope with a 'sprite' field (url, cell size, grid and the [x, y]
+# offset of every tile), or sprite null when sheets cannot be made (no Pillow)
+@app.route('/api/sprite')
+@dataset_cached
+def get_sprite_page():
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), SPRITE_MAX_TILES)
+        size = int(request.args.get('size', SPRITE_TILE))
+        if size not in SPRITE_SIZES:
+            raise ValueError(f"size must be one of {', '.join(map(str, SPRITE_SIZES))}, got {size}")
+        rows, key, start, end, total, page = query_page(request.args, limit)
+    except ValueError as e:
+        return jsonify({'error': str(e), 'data': [], 'total': 0, 'limit': 0}), 400
+    
+    sprite = None
+    if sprites.available and end > start:
+        sprite = page_sprite(rows, key, start, end, size)
+        # Start the next page too, so it is ready when the grid scrolls to it
+        if end < total:
+            next_rows, _, next_start, next_end, _, _ = query_page({'cursor': encode_cursor(end, key, total)}, limit)
+            page_sprite(next_rows, key, next_start, next_end, size)
+    with stage_seconds.timer('serialize'):
+        body = encode_envelope(
+            encode_records(rows),
+            total=total,
+            page=page,
+            limit=limit,
+            next_cursor=encode_cursor(end, key, total) if end < total else None,
+            sprite=sprite
+        )
+    return app.response_class(body, mimetype='application/json')
+
+# A contact sheet named by /api/sprite. The query and row range come along in the URL,
+# so any worker can compose the sheet; the name must match them and the current dataset.
+@app.route('/sprites/<int:size>/<name>.jpg')
+def serve_sprite(size, name):
+    if size not in SPRITE_SIZES or not sprites.available:
+        abort(404)
+    try:
+        key = request.args.get('q', '')
+        start, end = int(request.args['start']), int(request.args['end'])
+    except (KeyError, ValueError):
+        abort(404)
+    if end - start > SPRITE_MAX_TILES or start < 0 or end <= start or sprite_name(key, start, end, size) != name:
+        abort(404)
+    try:
+        check_query_key(key)
+    except ValueError:
+        abort(400)
+    with stage_seconds.timer('sprite'):
+        path = sprites.get(size, name, lambda: range_tile_paths(key, start, end), SPRITE_WAIT)
+    if path is None:
+        abort(404)
+    return send_immutable(os.path.dirname(path), os.path.basename(path), 'image/jpeg')
+
+# Per-celebrity browsing: the precomputed table (photo count, age and photo-year
+# ranges, best face score and representative image of every celeb_id), filtered
+# by a name substring and ordered by photos, name, best_face_score or celeb_id
+@app.route('/api/celebrities')
+@dataset_cached
+def get_celebrities():
+    celebrities = current_dataset().celebrities
+    if celebrities is None:
+        return jsonify({'error': 'No celebrity table, run mat_expanded.py', 'data': [], 'total': 0}), 404
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), CELEBRITIES_LIMIT_MAX)
+        page = max(int(request.args.get('page', 1)), 1)
+        sort = request.args.get('sort', 'photos').strip().lower() or 'photos'
+        if sort not in CELEBRITY_SORTS:
+            raise ValueError(f"sort must be one of {', '.join(CELEBRITY_SORTS)}, got {sort!r}")
+        order = request.args.get('order', '').strip().lower() or CELEBRITY_SORTS[sort]
+        if order not in ('asc', 'desc'):
+            raise ValueError(f"order must be asc or desc, got {order!r}")
+    except ValueError as e:
+        return jsonify({'error': str(e), 'data': [], 'total': 0}), 400
+
+    positions = celebrities.list(search_key(request.args.get('search', '')), sort, order)
+    start = min((page - 1) * limit, len(positions))
+    rows = celebrities.table.iloc[positions[start:start + limit]].copy()
+    rows['has_image'] = load_image_index().contains_many(rows['image'].tolist())
+    body = encode_envelope(encode_records(rows), total=len(positions), page=page, limit=limit)
+    return app.response_class(body, mimetype='application/json')
+
+# One celebrity: its table row and a page of its photos (the /api/data rows of
+# celeb_id=<id>), in dataset order or by one of the /api/data sort columns
+@app.route('/api/celebrities/<int:celeb_id>')
+@dataset_cached
+def get_celebrity(celeb_id):
+    celebrities = current_dataset().celebrities
+    if celebrities is None:
+        return jsonify({'error': 'No celebrity table, run mat_expanded.py'}), 404
+    i = celebrities.find(celeb_id)
+    if i is None:
+        return jsonify({'error': f"Unknown celeb_id {celeb_id}"}), 404
+    facet_index = load_facet_index()
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), CELEBRITIES_LIMIT_MAX)
+        page = max(int(request.args.get('page', 1)), 1)
+        params = dict(facet_index.parse({name: request.args.get(name, '') for name in ('sort', 'order')}))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    row = celebrities.table.iloc[i:i + 1].copy()
+    row['has_image'] = load_image_index().contains_many(row['image'].tolist())
+    positions = celebrities.photos(celeb_id)
+    if params.get('sort'):
+        positions = facet_index.sorts[params['sort']].sort(positions, params['order'])
+    start = min((page - 1) * limit, len(positions))
+    with stage_seconds.timer('slice'):
+        photos = page_frame(load_data().iloc[positions[start:start + limit]])
+    with stage_seconds.timer('serialize'):
+        body = encode_envelope(encode_records(photos), celebrity=json.loads(encode_records(row))[0],
+                               total=len(positions), page=page, limit=limit)
+    return app.response_class(body, mimetype='application/json')
+
+# Facet histograms (gender, source, age, photo year, face score) of the rows
+# matching the same search and filters as /api/data
+@app.route('/api/facets')
+@dataset_cached
+def get_facets():
+    # The histograms do not depend on the row order, so a sort shares the unsorted result
+    args = {name: value for name, value in request.args.items() if name not in ('sort', 'order')}
+    try:
+        key = query_key(args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    facet_index = load_facet_index()
+    if not key:
+        return jsonify({'total': facet_index.size, 'facets': facet_index.all_counts})
+    with stage_seconds.timer('filter'):
+        positions = query_positions(key)
+    return jsonify({'total': len(positions), 'facets': facet_index.counts(positions)})
+
+# Readiness probe: load state and timing of the dataset; 503 until the first load succeeds
+@app.route('/api/ready')
+def ready():
+    status = datasets.status()
+    dataset = datasets.current
+    if dataset is not None:
+        status.update(rows=len(dataset.df), fingerprint=dataset.fingerprint)
+    response = jsonify(status)
+    response.status_code = 200 if status['ready'] else 503
+    response.cache_control.no_store = True
+    return response
+
+# Prometheus metrics: request counters and latencies summed over all workers,
+# plus gauges of the dataset and of this worker's result cache
+@app.route('/metrics')
+def prometheus_metrics():
+    lines = metrics.lines()
+    # The cache counts its own lookups (also served by /api/cache-stats)
+    cache = result_cache.stats()
+    lines += gauge_lines('imdb_result_cache_lookups', 'Filtered result cache lookups in this worker',
+                         [(('hit',), cache['hits']), (('miss',), cache['misses'])], ('result',))
+    if cache['hits'] + cache['misses']:
+        lines += gauge_lines('imdb_result_cache_hit_ratio', 'Share of this worker\'s filtered result cache lookups that hit',
+                             [((), cache['hit_rate'])])
+    lines += gauge_lines('imdb_result_cache_entries', 'Result sets cached in this worker', [((), cache['entries'])])
+    lines += gauge_lines('imdb_result_cache_bytes', 'Bytes of result sets cached in this worker', [((), cache['bytes'])])
+    status = datasets.status()
+    dataset = datasets.current
+    lines += gauge_lines('imdb_dataset_ready', 'Whether the dataset has loaded', [((), int(status['ready']))])
+    lines += gauge_lines('imdb_dataset_load_seconds', 'Time the current dataset version took to load',
+                         [((), status['load_seconds'])])
+    lines += gauge_lines('imdb_dataset_reloads', 'Dataset versions swapped in since start', [((), status['reloads'])])
+    if dataset is not None:
+        lines += gauge_lines('imdb_dataset_rows', 'Rows in the loaded dataset', [((), len(dataset.df))])
+        lines += gauge_lines('imdb_dataset_bytes', 'Memory of the loaded dataset columns',
+                             [((), int(dataset.df.memory_usage(index=False).sum()))])
+        lines += gauge_lines('imdb_dataset_images', 'Image files found by the image index', [((), len(dataset.image_index))])
+    return app.response_class('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+# Hit/miss counters of the search result cache
+@app.route('/api/cache-stats')
+def cache_stats():
+    return jsonify(result_cache.stats())
+
 @app.route('/api/image/<path:image_path>')
 def get_image_path(image_path):
-    # Return the full path or handle errors
-    full_path = os.path.join(IMAGE_DIR, image_path)
-    if os.path.exists(full_path):
+    # Look the path up in the file index instead of the filesystem
+    full_path = os.path.relpath(os.path.join(IMAGE_DIR, image_path), IMAGE_ROOT)
+    if load_image_index().contains(full_path):
         return jsonify({'exists': True, 'path': image_path})
     else:
         return jsonify({'exists': False})
 
+# Existence of many dataset image paths in one call: POST {"paths": [...]}
+@app.route('/api/images/exists', methods=['POST'])
+def images_exist():
+    payload = request.get_json(silent=True) or {}
+    paths = payload.get('paths')
+    if not isinstance(paths, list) or not all(isinstance(path, str) for path in paths):
+        return jsonify({'error': 'Expected a JSON body {"paths": [...]} with string paths'}), 400
+    if len(paths) > EXISTS_BATCH_MAX:
+        return jsonify({'error': f'At most {EXISTS_BATCH_MAX} paths per request'}), 400
+    image_index = load_image_index()
+    return jsonify({
+        'exists': [image_index.contains(path) for path in paths],
+        'count': len(paths)
+    })
+
 # Route to serve images directly
 @app.route('/images/<path:filename>')
 def serve_image(filename):
     # The filename might have a path like "imdb_crop/01/nm0000001_rm946909184_1899-5-10_1968.jpg"
-    # We need to extract the proper path components for send_from_directory
+    # We need to extract the proper path components for serving
     
     # If the path starts with the image directory, strip it for correct serving
     if filename.startswith(IMAGE_DIR + '/'):
         path = filename[len(IMAGE_DIR)+1:]
-        return send_from_directory(IMAGE_DIR, path)
+        return send_immutable(IMAGE_DIR, path)
     
     # Otherwise try to serve from the parent directory
-    return send_from_directory('..', filename)
+    return send_immutable('..', filename)
+
+# Route to serve a downscaled copy of an image for the grid
+@app.route('/thumbs/<int:size>/<path:filename>')
+def serve_thumbnail(size, filename):
+    if size not in THUMB_SIZES:
+        abort(404)
+    # Without Pillow, or for an unreadable image, fall back to the full-size crop
+    if not thumbnails.available:
+        return serve_image(filename)
+    try:
+        with stage_seconds.timer('thumbnail'):
+            thumb_path = thumbnails.get(size, filename)
+    except OSError as e:
+        print(f"Error making thumbnail for {filename}: {e}")
+        return serve_image(filename)
+    if thumb_path is None:
+        abort(404)
+    return send_immutable(os.path.dirname(thumb_path), os.path.basename(thumb_path), 'image/jpeg')
+
+# Every route exists now: declare the per-route series and map the shared metrics memory
+# (before gunicorn forks the workers)
+ROUTES = sorted({rule.endpoint for rule in app.url_map.iter_rules()}) + ['unmatched']
+request_seconds, requests_total = request_metrics(metrics, ROUTES)
+metrics.allocate()
 
 if __name__ == '__main__':
+    # Under the debug reloader only the child process serves requests
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        datasets.start()
     app.run(debug=True, host='0.0.0.0', port=5000)
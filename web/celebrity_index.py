@@ -0,0 +1,57 @@
+import numpy as np
+
+from search_index import NameIndex
+
+# Per-celebrity browsing over the table mat_expanded.py precomputes
+# (celebrities.parquet: photo count, age and photo-year ranges, best face score
+# and a representative image per celeb_id). A person's photos are one slice of
+# the celeb_id group index the filters already keep, never a scan of the rows,
+# and a name search goes through the same trigram index as /api/data's.
+
+# sort= parameter -> table column, and the order used when none is given
+CELEBRITY_SORTS = {
+    'photos': 'desc',
+    'name': 'asc',
+    'best_face_score': 'desc',
+    'celeb_id': 'asc',
+}
+
+
+class CelebrityIndex:
+    def __init__(self, table, groups):
+        self.table = table.sort_values('celeb_id', kind='stable').reset_index(drop=True)
+        self.ids = self.table['celeb_id'].to_numpy()
+        self.names = np.array([str(name).lower() for name in self.table['name'].tolist()], dtype=object)
+        self.name_index = NameIndex(self.table['name'])
+        self.groups = groups  # GroupIndex of the dataset's celeb_id column
+        # Table positions in every sort order; ties stay in celeb_id order both ways
+        self.orders = {}
+        for column in CELEBRITY_SORTS:
+            values = self.names if column == 'name' else self.table[column].to_numpy()
+            ranks = np.unique(values, return_inverse=True)[1].reshape(-1)
+            self.orders[column, 'asc'] = np.argsort(ranks, kind='stable')
+            self.orders[column, 'desc'] = np.argsort(-ranks, kind='stable')
+
+    def __len__(self):
+        return len(self.table)
+
+    # Table position of a celebrity, or None
+    def find(self, celeb_id):
+        i = int(np.searchsorted(self.ids, celeb_id))
+        return i if i < len(self.ids) and self.ids[i] == celeb_id else None
+
+    # Table positions, optionally only names containing `search`, in the given order
+    def list(self, search, sort, order):
+        positions = self.orders[sort, order]
+        if search:
+            matches = np.zeros(len(self.table), dtype=bool)
+            matches[self.name_index.search(search)] = True
+            positions = positions[matches[positions]]
+        return positions
+
+    # Dataset rows of a celebrity, in row order
+    def photos(self, celeb_id):
+        group = self.groups.ids.get(str(celeb_id))
+        if group is None:
+            return np.empty(0, dtype=np.int32)
+        return self.groups.rows[self.groups.offsets[group]:self.groups.offsets[group + 1]]
@@ -0,0 +1,118 @@
+import threading
+import time
+
+# Holds the loaded dataset (with everything derived from it) and replaces it
+# when the files it was read from change. Versions are built on a background
+# thread and swapped in with a single assignment, so a request sees either the
+# old version or the new one, never a mix; until the first version is ready,
+# requests wait for it instead of loading the dataset themselves.
+#
+# The files are polled rather than watched through inotify, and a change is only
+# picked up once the files have stayed the same for a whole poll interval, so a
+# file that is still being written is never read.
+
+
+class DatasetNotReady(Exception):
+    pass
+
+
+class DatasetManager:
+    # build() returns a new dataset version; sources() returns a comparable
+    # snapshot (e.g. mtimes and sizes) of the files it reads
+    def __init__(self, build, sources, interval=5, on_swap=()):
+        self.build = build
+        self.sources = sources
+        self.interval = interval
+        self.on_swap = list(on_swap)
+        self.current = None
+        self.version = None
+        self.failed_version = None
+        self.state = 'idle'  # idle, loading, ready, reloading or failed
+        self.error = None
+        self.loaded_at = None
+        self.load_seconds = None
+        self.reloads = 0
+        self.first_load = threading.Event()  # Set once the first load has finished, successfully or not
+        self.build_lock = threading.Lock()
+        self.thread_lock = threading.Lock()
+        self.thread = None
+
+    # Build a version from the current files and swap it in; returns whether it succeeded
+    def load(self):
+        with self.build_lock:
+            version = self.sources()
+            self.state = 'loading' if self.current is None else 'reloading'
+            start = time.time()
+            try:
+                dataset = self.build()
+            except Exception as e:
+                self.error = f"{type(e).__name__}: {e}"
+                self.failed_version = version
+                self.state = 'failed' if self.current is None else 'ready'
+                print(f"Error loading dataset: {self.error}")
+                self.first_load.set()
+                return False
+            if self.current is not None:
+                self.reloads += 1
+            self.current = dataset
+            self.version = version
+            self.error = None
+            self.loaded_at = time.time()
+            self.load_seconds = self.loaded_at - start
+            self.state = 'ready'
+            # Only now: a waiting get() must find the dataset (or the error) in place
+            self.first_load.set()
+            print(f"Loaded dataset in {self.load_seconds:.2f}s")
+            for callback in self.on_swap:
+                callback(dataset)
+            return True
+
+    # Load in the background (unless already loaded) and keep watching the files.
+    # Threads do not survive fork(), so a forked worker calls this again.
+    def start(self):
+        with self.thread_lock:
+            if self.thread is None or not self.thread.is_alive():
+                if self.current is None:
+                    self.state = 'loading'
+                self.thread = threading.Thread(target=self.watch, name='dataset-manager', daemon=True)
+                self.thread.start()
+
+    def watch(self):
+        if self.current is None:
+            self.load()
+        pending = None
+        while True:
+            time.sleep(self.interval)
+            try:
+                version = self.sources()
+            except OSError as e:
+                print(f"Error checking the dataset files: {e}")
+                continue
+            if version in (self.version, self.failed_version):
+                pending = None
+            elif version != pending:
+                pending = version  # Changed since the last poll: wait until it settles
+            else:
+                self.load()
+                pending = None
+
+    # The current version, waiting up to `timeout` seconds for the first load
+    def get(self, timeout=None):
+        dataset = self.current
+        if dataset is not None:
+            return dataset
+        self.start()
+        self.first_load.wait(timeout)
+        if self.current is None:
+            raise DatasetNotReady(self.error or 'The dataset is still loading')
+        return self.current
+
+    def status(self):
+        return {
+            'state': self.state,
+            'ready': self.current is not None,
+            'loaded_at': self.loaded_at,
+            'load_seconds': self.load_seconds,
+            'reloads': self.reloads,
+            'error': self.error,
+        }
@@ -0,0 +1,233 @@
+import numpy as np
+import pandas as pd
+
+# Precomputed indexes for the /api/data filters and the facet histograms.
+#
+# Range filters (age, photo year, face score) keep the row order sorted by the
+# column, so a range is two binary searches; equality filters (gender, source,
+# celebrity) keep the rows grouped by value, so a value is one slice. Combined
+# filters start from the most selective one and only check the other
+# conditions on its rows, never on the whole frame. Sorted views reuse
+# permutations computed once at load time instead of sorting the frame.
+
+# Query parameter -> (column, lowest valid value). Unknown ages and years are
+# stored as -1 and faces that were not detected as -inf, so they never match.
+RANGE_FILTERS = {
+    'age': ('age', 0),
+    'photo_taken': ('photo_taken', 0),
+    'face_score': ('face_score1', np.finfo(np.float64).min),
+}
+# Query parameter -> column; values may be comma-separated
+EQUAL_FILTERS = {
+    'gender': 'gender',
+    'source': 'source',
+    'celeb_id': 'celeb_id',
+}
+# sort= parameter -> column; rows with an unknown value (as for the range filters) sort last
+SORT_COLUMNS = {
+    'age': 'age',
+    'face_score': 'face_score1',
+    'photo_taken': 'photo_taken',
+}
+SORT_ORDERS = ('asc', 'desc')
+# Face score histogram bins; scores outside them are left out
+FACE_SCORE_BINS = np.arange(0, 8.5, 0.5)
+
+
+# One filter condition: how many rows match, the matching rows, and a check of
+# the condition on given rows
+class Predicate:
+    def __init__(self, count, materialize, verify):
+        self.count = count
+        self.materialize = materialize
+        self.verify = verify
+
+
+# Rows of a precomputed, sorted set of positions (such as a name search result)
+def positions_predicate(positions):
+    def verify(candidates):
+        if len(positions) == 0:
+            return np.zeros(len(candidates), dtype=bool)
+        found = np.minimum(np.searchsorted(positions, candidates), len(positions) - 1)
+        return positions[found] == candidates
+    return Predicate(len(positions), lambda: positions, verify)
+
+
+# Row positions matching every predicate, in row order
+def intersect(predicates):
+    predicates = sorted(predicates, key=lambda p: p.count)
+    positions = np.asarray(predicates[0].materialize(), dtype=np.int32)
+    for predicate in predicates[1:]:
+        if len(positions) == 0:
+            break
+        positions = positions[predicate.verify(positions)]
+    return positions
+
+
+class RangeIndex:
+    def __init__(self, values, floor):
+        self.values = np.asarray(values)
+        self.floor = floor
+        self.order = np.argsort(self.values, kind='stable').astype(np.int32)
+        self.sorted = self.values[self.order]
+        # NaN sorts last and never matches a range
+        self.valid = len(self.sorted) - int(pd.isna(self.sorted).sum()) if self.values.dtype.kind == 'f' else len(self.sorted)
+
+    def predicate(self, low, high):
+        low = self.floor if low is None else max(low, self.floor)
+        start = int(np.searchsorted(self.sorted[:self.valid], low, 'left'))
+        stop = self.valid if high is None else int(np.searchsorted(self.sorted[:self.valid], high, 'right'))
+        stop = max(start, stop)
+        high = np.inf if high is None else high
+        values = self.values
+        return Predicate(stop - start,
+                         lambda: np.sort(self.order[start:stop]),
+                         lambda candidates: (values[candidates] >= low) & (values[candidates] <= high))
+
+
+class GroupIndex:
+    def __init__(self, values):
+        values = pd.Series(values)
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(object)
+        codes, uniques = pd.factorize(values, sort=True)
+        self.codes = codes.astype(np.int32)
+        self.ids = {str(value): i for i, value in enumerate(uniques.tolist())}
+        order = np.argsort(codes, kind='stable').astype(np.int32)
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        self.rows = order[len(order) - int(counts.sum()):]
+        self.offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+
+    def predicate(self, wanted):
+        ids = sorted({self.ids[value] for value in wanted if value in self.ids})
+        count = int(sum(self.offsets[i + 1] - self.offsets[i] for i in ids))
+
+        def materialize():
+            groups = [self.rows[self.offsets[i]:self.offsets[i + 1]] for i in ids]
+            if not groups:
+                return np.empty(0, dtype=np.int32)
+            return groups[0] if len(groups) == 1 else np.sort(np.concatenate(groups))
+
+        codes = self.codes
+        return Predicate(count, materialize, lambda candidates: np.isin(codes[candidates], ids))
+
+
+# Precomputed permutations of one sortable column. Rows are ranked by value
+# (equal values share a rank, unknown values rank last), so a filtered result
+# is sorted with a stable argsort of its ranks and ties keep the row order.
+class SortIndex:
+    def __init__(self, values, floor):
+        values = np.asarray(values)
+        with np.errstate(invalid='ignore'):
+            valid = values >= floor
+        uniques, ranks = np.unique(values[valid], return_inverse=True)
+        self.unknown = len(uniques)
+        self.ranks = np.full(len(values), self.unknown, dtype=np.int32)
+        self.ranks[valid] = ranks.reshape(-1)
+        self.orders = {order: np.argsort(self.order_ranks(self.ranks, order), kind='stable').astype(np.int32)
+                       for order in SORT_ORDERS}
+
+    def order_ranks(self, ranks, order):
+        if order == 'asc':
+            return ranks
+        return np.where(ranks < self.unknown, self.unknown - 1 - ranks, self.unknown)
+
+    # All rows (positions None) or the given rows, in sorted order
+    def sort(self, positions, order):
+        if positions is None:
+            return self.orders[order]
+        return positions[np.argsort(self.order_ranks(self.ranks[positions], order), kind='stable')]
+
+
+# Parse a filter number, keeping integers integral so equal filters share a cache key
+def parse_number(text, name):
+    try:
+        value = float(text)
+    except ValueError:
+        raise ValueError(f"{name} must be a number, got {text!r}")
+    if not np.isfinite(value):
+        raise ValueError(f"{name} must be finite, got {text!r}")
+    return int(value) if value.is_integer() else value
+
+
+class FacetIndex:
+    def __init__(self, df):
+        self.size = len(df)
+        self.ranges = {name: RangeIndex(df[col].to_numpy(), floor)
+                       for name, (col, floor) in RANGE_FILTERS.items() if col in df}
+        self.groups = {name: GroupIndex(df[col]) for name, col in EQUAL_FILTERS.items() if col in df}
+        self.sorts = {name: SortIndex(df[col].to_numpy(), RANGE_FILTERS[name][1])
+                      for name, col in SORT_COLUMNS.items() if col in df}
+        # Histograms of the whole dataset, the most common request
+        self.all_counts = self.counts(None)
+
+    # Normalized filters from request arguments, as ordered (param, value) pairs;
+    # the order and formatting are canonical so they can key a cache. A filter on
+    # a column this dataset lacks (e.g. source in a legacy CSV) is a ValueError.
+    def parse(self, args):
+        filters = []
+        for name in RANGE_FILTERS:
+            for suffix in ('_min', '_max'):
+                text = args.get(name + suffix, '').strip()
+                if text:
+                    if name not in self.ranges:
+                        raise ValueError(f"{name + suffix} is not available for this dataset")
+                    filters.append((name + suffix, str(parse_number(text, name + suffix))))
+        for name in EQUAL_FILTERS:
+            text = args.get(name, '').strip()
+            if text:
+                if name not in self.groups:
+                    raise ValueError(f"{name} is not available for this dataset")
+                values = sorted({value.strip().lower() for value in text.split(',') if value.strip()})
+                if name == 'celeb_id':
+                    values = sorted({str(parse_number(value, name)) for value in values})
+                filters.append((name, ','.join(values)))
+        sort = args.get('sort', '').strip().lower()
+        if sort:
+            order = args.get('order', 'asc').strip().lower() or 'asc'
+            if sort not in self.sorts:
+                raise ValueError(f"sort must be one of {', '.join(self.sorts)}, got {sort!r}")
+            if order not in SORT_ORDERS:
+                raise ValueError(f"order must be one of {', '.join(SORT_ORDERS)}, got {order!r}")
+            filters += [('sort', sort), ('order', order)]
+        return filters
+
+    def predicates(self, filters):
+        filters = dict(filters)
+        predicates = []
+        for name, index in self.ranges.items():
+            low, high = filters.get(name + '_min'), filters.get(name + '_max')
+            if low is not None or high is not None:
+                predicates.append(index.predicate(None if low is None else float(low),
+                                                  None if high is None else float(high)))
+        for name, index in self.groups.items():
+            if name in filters:
+                predicates.append(index.predicate(filters[name].split(',')))
+        return predicates
+
+    # Histograms of the facet columns over the given rows (all rows when None)
+    def counts(self, positions):
+        facets = {}
+        for name in ('gender', 'source'):
+            index = self.groups.get(name)
+            if index is None:
+                continue
+            codes = index.codes if positions is None else index.codes[positions]
+            counts = np.bincount(codes + 1, minlength=len(index.ids) + 1)
+            facets[name] = [{'value': value, 'count': int(counts[i + 1])} for value, i in index.ids.items()]
+            if counts[0]:
+                facets[name].append({'value': None, 'count': int(counts[0])})
+        for name in ('age', 'photo_taken'):
+            index = self.ranges.get(name)
+            if index is None:
+                continue
+            values = index.values if positions is None else index.values[positions]
+            values, counts = np.unique(values[values >= index.floor], return_counts=True)
+            facets[name] = [{'value': int(v), 'count': int(c)} for v, c in zip(values.tolist(), counts.tolist())]
+        index = self.ranges.get('face_score')
+        if index is not None:
+            values = index.values if positions is None else index.values[positions]
+            counts, edges = np.histogram(values[np.isfinite(values)], bins=FACE_SCORE_BINS)
+            facets['face_score'] = [{'min': float(lo), 'max': float(hi), 'count': int(c)}
+                                    for lo, hi, c in zip(edges[:-1].tolist(), edges[1:].tolist(), counts.tolist())]
+        return facets
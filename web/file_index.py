@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+import posixpath
+import time
+
+# In-memory index of the image files under the crop directories, so existence
+# checks never touch the filesystem. Paths are relative to `root`, like the
+# dataset paths ('imdb_crop/01/nm0000001_rm946909184_1899-5-10_1968.jpg').
+#
+# The listing is saved to a manifest keyed by directory mtime. Adding or
+# removing a file changes the mtime of its directory, so on the next start only
+# the directories that changed are listed again; the rest cost one stat each.
+
+MANIFEST_VERSION = 1
+
+
+class FileIndex:
+    def __init__(self, root, dirs, manifest_path=None):
+        self.root = root
+        self.dirs = dirs
+        self.manifest_path = manifest_path
+        self.files = {}  # directory -> frozenset of file names
+        self.version = ''
+
+    def build(self):
+        start = time.time()
+        previous = self.load_manifest()
+        listing = {}
+        rescanned = 0
+        for top in self.dirs:
+            stack = [top]
+            while stack:
+                rel_dir = stack.pop()
+                try:
+                    mtime_ns = os.stat(os.path.join(self.root, rel_dir)).st_mtime_ns
+                except FileNotFoundError:
+                    continue
+                record = previous.get(rel_dir)
+                if record is None or record['mtime_ns'] != mtime_ns:
+                    record = self.scan_dir(rel_dir, mtime_ns)
+                    rescanned += 1
+                listing[rel_dir] = record
+                stack.extend(posixpath.join(rel_dir, child) for child in record['dirs'])
+
+        self.files = {rel_dir: frozenset(record['files']) for rel_dir, record in listing.items()}
+        state = ''.join(f"{rel_dir}:{record['mtime_ns']};" for rel_dir, record in sorted(listing.items()))
+        self.version = hashlib.blake2b(state.encode('utf-8'), digest_size=8).hexdigest()
+        if rescanned:
+            self.save_manifest(listing)
+        print(f"Indexed {len(self)} images in {len(listing)} directories "
+              f"({rescanned} rescanned) in {time.time() - start:.2f}s")
+        return self
+
+    def scan_dir(self, rel_dir, mtime_ns):
+        files, dirs = [], []
+        with os.scandir(os.path.join(self.root, rel_dir)) as entries:
+            for entry in entries:
+                (dirs if entry.is_dir() else files).append(entry.name)
+        return {'mtime_ns': mtime_ns, 'files': sorted(files), 'dirs': sorted(dirs)}
+
+    def load_manifest(self):
+        if not self.manifest_path or not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable image manifest {self.manifest_path}: {e}")
+            return {}
+        if manifest.get('version') != MANIFEST_VERSION or manifest.get('root') != os.path.abspath(self.root):
+            return {}
+        return manifest['dirs']
+
+    def save_manifest(self, listing):
+        if not self.manifest_path:
+            return
+        manifest = {'version': MANIFEST_VERSION, 'root': os.path.abspath(self.root), 'dirs': listing}
+        os.makedirs(os.path.dirname(self.manifest_path) or '.', exist_ok=True)
+        # Per process: every worker rebuilds the index when the dataset is reloaded
+        tmp = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f, separators=(',', ':'))
+        os.replace(tmp, self.manifest_path)
+
+    def __len__(self):
+        return sum(len(names) for names in self.files.values())
+
+    def contains(self, path):
+        path = posixpath.normpath(path)
+        if path.startswith(('/', '../')):
+            return False
+        rel_dir, name = posixpath.split(path)
+        names = self.files.get(rel_dir)
+        return names is not None and name in names
+
+    # Existence of many (already normalized) dataset paths at once, as a list of bools
+    def contains_many(self, paths):
+        files = self.files
+        empty = frozenset()
+        return [name in files.get(rel_dir, empty) for rel_dir, _, name in (path.rpartition('/') for path in paths)]
@@ -0,0 +1,44 @@
+import gc
+import multiprocessing
+import os
+import signal
+
+# Production server settings; WEB_WORKERS / WEB_THREADS / WEB_BIND override them.
+# The app is loaded in the master before forking (see wsgi.py), so adding
+# workers shares the dataset instead of loading it again in every process.
+bind = os.environ.get('WEB_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('WEB_THREADS', 4))
+worker_class = 'gthread'
+preload_app = True
+timeout = 120
+
+
+# Hot reloads happen in the master too: it watches the dataset files, builds the
+# new version and then restarts the workers gracefully (HUP), so the new workers
+# share it copy-on-write like the first one. A worker that reloaded on its own
+# would build a private copy of the dataset and every index, and resident memory
+# after a reload would grow with the worker count.
+def when_ready(server):
+    from app import datasets
+
+    def refork(dataset):
+        if os.getpid() != server.pid:
+            return  # A worker that had to load the dataset itself (see DatasetManager.get)
+        # Freeze the new version like the first one (wsgi.py); unfreeze first so
+        # the old version can still be collected
+        gc.unfreeze()
+        gc.collect()
+        gc.freeze()
+        server.log.info("Dataset reloaded, restarting the workers")
+        os.kill(server.pid, signal.SIGHUP)
+
+    datasets.on_swap.append(refork)
+    datasets.start()
+
+
+# Runs once the response is written and closed, so file transfers are timed to the last byte
+def post_request(worker, req, environ, resp):
+    from app import record_file_sent
+
+    record_file_sent(environ)
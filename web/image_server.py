@@ -0,0 +1,149 @@
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+from werkzeug.security import safe_join
+
+from metrics import MetricsRegistry, request_metrics
+from thumbnails import THUMB_SIZES, ThumbnailCache
+
+# Asynchronous image server that runs next to the Flask API, so a burst of grid
+# tiles never queues /api/data behind file transfers in the same workers.
+# Files go out through FileResponse, which uses sendfile() where the platform
+# has it; stat calls and thumbnail resizing run in a thread pool so the event
+# loop never blocks on the disk, and a semaphore caps concurrent transfers.
+#
+# The web page loads images from here when the Flask app is started with
+# IMAGE_PUBLIC_URL pointing at this server (for example ':5001').
+#
+# GET /metrics serves the same request series as the Flask app (per-route
+# latency and status counts, and the send_file and thumbnail steps) for this
+# process; the latency includes sending the file.
+
+IMAGE_ROOT = '..'  # Dataset image paths are relative to this directory
+IMAGE_MAX_AGE = 365 * 24 * 3600
+IMAGE_PORT = int(os.environ.get('IMAGE_PORT', 5001))
+IMAGE_CONCURRENCY = int(os.environ.get('IMAGE_CONCURRENCY', 64))
+ROUTES = ('serve_image', 'serve_thumbnail', 'metrics', 'unmatched')
+IMAGE_STAGES = ('send_file', 'thumbnail')
+
+
+# FileResponse that holds a transfer slot until the body is sent. The
+# record_request middleware sends it; aiohttp prepares it again after the
+# middleware returns, which FileResponse (unlike Response) doesn't ignore
+class LimitedFileResponse(web.FileResponse):
+    def __init__(self, slots, stage_seconds, path, **kwargs):
+        super().__init__(path, **kwargs)
+        self.slots = slots
+        self.stage_seconds = stage_seconds
+
+    async def prepare(self, request):
+        if self.prepared:
+            return None
+        async with self.slots:
+            with self.stage_seconds.timer('send_file'):
+                return await super().prepare(request)
+
+
+class ImageServer:
+    def __init__(self, concurrency=IMAGE_CONCURRENCY):
+        self.slots = asyncio.Semaphore(concurrency)
+        self.executor = ThreadPoolExecutor(max_workers=min(32, concurrency))
+        self.thumbnails = ThumbnailCache(IMAGE_ROOT)
+        # One process, so the registry needs a single row
+        self.metrics = MetricsRegistry(slots=1)
+        self.stage_seconds = self.metrics.histogram('imdb_request_stage_seconds',
+                                                    'Time spent in one step of handling a request',
+                                                    ('stage',), [(stage,) for stage in IMAGE_STAGES])
+        self.request_seconds, self.requests_total = request_metrics(self.metrics, ROUTES)
+        self.metrics.allocate()
+
+    # Count and time every request, sending the response here so the time includes the transfer
+    @web.middleware
+    async def record_request(self, request, handler):
+        route = request.match_info.route.name if request.match_info.route.name in ROUTES else 'unmatched'
+        started = time.perf_counter()
+        try:
+            response = await handler(request)
+            await response.prepare(request)
+            status = response.status
+            return response
+        except web.HTTPException as e:
+            status = e.status
+            raise
+        except Exception:
+            status = 500
+            raise
+        finally:
+            self.request_seconds.observe(time.perf_counter() - started, route)
+            self.requests_total.inc(route, f'{status // 100}xx')
+
+    async def serve_metrics(self, request):
+        return web.Response(text='\n'.join(self.metrics.lines()) + '\n', content_type='text/plain')
+
+    async def send_immutable(self, request, path, content_type=None):
+        loop = asyncio.get_running_loop()
+        try:
+            stat = await loop.run_in_executor(self.executor, os.stat, path)
+        except (FileNotFoundError, NotADirectoryError):
+            raise web.HTTPNotFound()
+        # Same validator as the Flask app, so either server can answer a revalidation
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        headers = {'Cache-Control': f'public, max-age={IMAGE_MAX_AGE}, immutable', 'ETag': etag}
+        if etag in request.headers.get('If-None-Match', ''):
+            return web.Response(status=304, headers=headers)
+        if content_type:
+            headers['Content-Type'] = content_type
+
+        return LimitedFileResponse(self.slots, self.stage_seconds, path, headers=headers)
+
+    async def serve_image(self, request):
+        path = safe_join(IMAGE_ROOT, request.match_info['path'])
+        if path is None:
+            raise web.HTTPNotFound()
+        return await self.send_immutable(request, path)
+
+    async def serve_thumbnail(self, request):
+        size = int(request.match_info['size'])
+        if size not in THUMB_SIZES:
+            raise web.HTTPNotFound()
+        if not self.thumbnails.available:
+            return await self.serve_image(request)
+        loop = asyncio.get_running_loop()
+        try:
+            with self.stage_seconds.timer('thumbnail'):
+                thumb_path = await loop.run_in_executor(self.executor, self.thumbnails.get, size,
+                                                        request.match_info['path'])
+        except OSError as e:
+            print(f"Error making thumbnail for {request.match_info['path']}: {e}")
+            return await self.serve_image(request)
+        if thumb_path is None:
+            raise web.HTTPNotFound()
+        return await self.send_immutable(request, thumb_path, 'image/jpeg')
+
+    async def shutdown(self, app):
+        self.executor.shutdown(wait=False)
+
+
+def make_app(concurrency=IMAGE_CONCURRENCY):
+    server = ImageServer(concurrency)
+    app = web.Application(middlewares=[server.record_request])
+    app.router.add_get('/images/{path:.+}', server.serve_image, name='serve_image')
+    app.router.add_get(r'/thumbs/{size:\d+}/{path:.+}', server.serve_thumbnail, name='serve_thumbnail')
+    app.router.add_get('/metrics', server.serve_metrics, name='metrics')
+    app.on_cleanup.append(server.shutdown)
+    return app
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve dataset images and thumbnails asynchronously')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=IMAGE_PORT)
+    parser.add_argument('--concurrency', type=int, default=IMAGE_CONCURRENCY,
+                        help='most files being sent at the same time')
+    args = parser.parse_args()
+
+    web.run_app(make_app(args.concurrency), host=args.host, port=args.port)
@@ -0,0 +1,183 @@
+import bisect
+import mmap
+import multiprocessing
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+# Prometheus metrics in the text exposition format, shared by all the worker
+# processes without a client library or a metrics daemon.
+#
+# Every series is a fixed range of cells in one float64 array in anonymous
+# shared memory, allocated before gunicorn forks the workers. Each process adds
+# to its own row (claimed on first use, and taken over by the replacement when
+# a worker dies, so counters never go backwards), so an update is a few array
+# writes with no cross-process locking; /metrics in any worker sums the rows.
+# Series are therefore declared up front, with every label value they can take.
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Most processes writing metrics at once; more share the last row
+METRICS_SLOTS = 64
+STATUS_CLASSES = ('1xx', '2xx', '3xx', '4xx', '5xx')
+
+
+def format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def format_labels(names, values, extra=''):
+    text = ','.join(f'{name}="{value}"' for name, value in zip(names, values))
+    text = ','.join(part for part in (text, extra) if part)
+    return f'{{{text}}}' if text else ''
+
+
+# Lines of a gauge family computed at scrape time: samples are (label values, value)
+def gauge_lines(name, help_text, samples, label_names=()):
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} gauge']
+    for values, value in samples:
+        if value is not None:
+            lines.append(f'{name}{format_labels(label_names, values)} {format_value(value)}')
+    return lines
+
+
+class MetricFamily:
+    def __init__(self, registry, kind, name, help_text, label_names, label_values, buckets=()):
+        self.registry = registry
+        self.kind = kind
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # Histograms keep one cell per bucket (plus one above the last bound) and the sum
+        width = len(self.buckets) + 2 if kind == 'histogram' else 1
+        self.offsets = {tuple(values): registry.reserve(width) for values in label_values}
+
+    def inc(self, *labels, amount=1):
+        self.registry.add(self.offsets[labels], amount)
+
+    def observe(self, value, *labels):
+        offset = self.offsets[labels]
+        self.registry.add_observation(offset + bisect.bisect_left(self.buckets, value),
+                                      offset + len(self.buckets) + 1, value)
+
+    @contextmanager
+    def timer(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def lines(self, totals):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        for values, offset in self.offsets.items():
+            if self.kind == 'counter':
+                lines.append(f'{self.name}{format_labels(self.label_names, values)} {format_value(totals[offset])}')
+                continue
+            cumulative = 0
+            for i, bound in enumerate(self.buckets + (float('inf'),)):
+                cumulative += totals[offset + i]
+                le = 'le="+Inf"' if i == len(self.buckets) else f'le="{bound}"'
+                lines.append(f'{self.name}_bucket{format_labels(self.label_names, values, le)} {format_value(cumulative)}')
+            labels = format_labels(self.label_names, values)
+            lines.append(f'{self.name}_sum{labels} {format_value(totals[offset + len(self.buckets) + 1])}')
+            lines.append(f'{self.name}_count{labels} {format_value(cumulative)}')
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self, slots=METRICS_SLOTS):
+        self.slots = slots
+        self.families = []
+        self.size = 0
+        self.rows = None
+        self.owners = None
+        self.slot = None
+        self.lock = threading.Lock()
+        os.register_at_fork(after_in_child=self.forked)
+
+    def reserve(self, width):
+        if self.rows is not None:
+            raise RuntimeError('Metrics must be declared before the registry is allocated')
+        offset = self.size
+        self.size += width
+        return offset
+
+    def counter(self, name, help_text, label_names=(), label_values=((),)):
+        family = MetricFamily(self, 'counter', name, help_text, label_names, label_values)
+        self.families.append(family)
+        return family
+
+    def histogram(self, name, help_text, label_names=(), label_values=((),), buckets=LATENCY_BUCKETS):
+        family = MetricFamily(self, 'histogram', name, help_text, label_names, label_values, buckets)
+        self.families.append(family)
+        return family
+
+    # Map the shared array once every series is declared; call before forking
+    def allocate(self):
+        memory = mmap.mmap(-1, self.slots * (self.size + 1) * 8)
+        self.owners = np.frombuffer(memory, dtype=np.int64, count=self.slots)
+        self.rows = np.frombuffer(memory, dtype=np.float64, offset=self.slots * 8).reshape(self.slots, self.size)
+        self.claim_lock = multiprocessing.Lock()
+
+    def forked(self):
+        self.slot = None
+        self.lock = threading.Lock()
+
+    # The row of this process: a free slot, or one whose process has exited
+    def row(self):
+        if self.slot is None:
+            pid = os.getpid()
+            with self.claim_lock:
+                for slot, owner in enumerate(self.owners.tolist()):
+                    if owner == 0 or owner == pid or not pid_alive(owner):
+                        break
+                self.owners[slot] = pid
+            self.slot = slot
+        return self.rows[self.slot]
+
+    def add(self, offset, amount):
+        if self.rows is None:
+            return
+        with self.lock:
+            self.row()[offset] += amount
+
+    def add_observation(self, bucket, sum_offset, value):
+        if self.rows is None:
+            return
+        with self.lock:
+            row = self.row()
+            row[bucket] += 1
+            row[sum_offset] += value
+
+    def total(self, family, *labels):
+        return 0.0 if self.rows is None else float(self.rows[:, family.offsets[labels]].sum())
+
+    def lines(self):
+        if self.rows is None:
+            return []
+        totals = self.rows.sum(axis=0).tolist()
+        return [line for family in self.families for line in family.lines(totals)]
+
+
+# Per-route latency and response counts, the same series in every server
+def request_metrics(registry, routes):
+    request_seconds = registry.histogram('http_request_duration_seconds', 'Time to handle a request, by route',
+                                         ('route',), [(route,) for route in routes])
+    requests_total = registry.counter('http_requests_total', 'Responses sent, by route and status class',
+                                      ('route', 'status'),
+                                      [(route, status) for route in routes for status in STATUS_CLASSES])
+    return request_seconds, requests_total
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
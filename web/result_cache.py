@@ -0,0 +1,67 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+# Bounded LRU + TTL cache of filtered result sets (arrays of row positions),
+# keyed by the normalized query. Infinite scroll asks for pages 2..N of the same
+# query, which then only slice the cached array.
+class ResultCache:
+    def __init__(self, max_entries=256, max_bytes=64 * 2**20, ttl=300):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (expires_at, positions)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, positions):
+        # Read-only, so a cached array can be shared between requests safely
+        positions.flags.writeable = False
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            if positions.nbytes > self.max_bytes:
+                return
+            self.entries[key] = (time.monotonic() + self.ttl, positions)
+            self.bytes += positions.nbytes
+            while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def _remove(self, key):
+        _, positions = self.entries.pop(key)
+        self.bytes -= positions.nbytes
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'bytes': self.bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,109 @@
+from bisect import bisect_left
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+# Shortest term answered from the trigram postings; shorter terms scan the
+# (much smaller) list of distinct names instead
+GRAM = 3
+# Gathering row groups costs roughly a microsecond per name, a pass over the
+# codes a few nanoseconds per row: switch to the pass above size/PASS_RATIO names
+PASS_RATIO = 250
+
+
+# In-memory index over the name column, built once at load time.
+# Rows are grouped by distinct name, and each lowercase name is indexed by its
+# trigrams, so a substring query only verifies the few names that contain every
+# trigram of the term and never touches the per-row strings.
+class NameIndex:
+    def __init__(self, names):
+        codes, uniques = pd.factorize(pd.Series(names, dtype=object), sort=False)
+        self.size = len(codes)
+        self.names = [str(name) for name in uniques]
+        self.lower = [name.lower() for name in self.names]
+
+        # Name code per row, -1 for missing names
+        self.codes = codes.astype(np.int32)
+
+        # Row positions grouped by name code, in original row order within a name
+        order = np.argsort(codes, kind='stable').astype(np.int32)
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.names))
+        self.rows = order[len(order) - int(counts.sum()):]
+        self.offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        self.counts = counts.astype(np.int64)
+
+        # Distinct names in case-insensitive order, for prefix lookups
+        self.sorted_ids = np.array(sorted(range(len(self.lower)), key=self.lower.__getitem__), dtype=np.int32)
+        self.sorted_keys = [self.lower[i] for i in self.sorted_ids]
+
+        postings = defaultdict(list)
+        for name_id, name in enumerate(self.lower):
+            for gram in {name[i:i + GRAM] for i in range(len(name) - GRAM + 1)}:
+                postings[gram].append(name_id)
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    # Ids of the distinct names that contain the term (case-insensitive)
+    def match_names(self, term):
+        term = term.lower()
+        if not term:
+            return np.arange(len(self.names), dtype=np.int32)
+        if len(term) < GRAM:
+            candidates = range(len(self.names))
+        else:
+            lists = []
+            for gram in {term[i:i + GRAM] for i in range(len(term) - GRAM + 1)}:
+                ids = self.postings.get(gram)
+                if ids is None:
+                    return np.empty(0, dtype=np.int32)
+                lists.append(ids)
+            lists.sort(key=len)
+            candidates = lists[0]
+            for ids in lists[1:]:
+                candidates = np.intersect1d(candidates, ids, assume_unique=True)
+            # A single trigram needs no verification
+            if len(term) == GRAM:
+                return candidates
+            candidates = candidates.tolist()
+        lower = self.lower
+        return np.array([i for i in candidates if term in lower[i]], dtype=np.int32)
+
+    # Ids of the distinct names that start with the prefix, in case-insensitive order
+    def match_prefix(self, prefix):
+        prefix = prefix.lower()
+        start = bisect_left(self.sorted_keys, prefix)
+        stop = bisect_left(self.sorted_keys, prefix + '\U0010ffff', start)
+        return self.sorted_ids[start:stop]
+
+    # Up to `limit` (name, photo count) pairs starting with the prefix, in
+    # case-insensitive order, and the total number of matching names.
+    # '\0' sorts after the empty name only, so it is never suggested.
+    def complete(self, prefix, limit):
+        prefix = prefix.lower()
+        start = bisect_left(self.sorted_keys, prefix or '\0')
+        stop = bisect_left(self.sorted_keys, prefix + '\U0010ffff', start)
+        top = self.sorted_ids[start:min(stop, start + max(limit, 0))].tolist()
+        return [(self.names[i], int(self.counts[i])) for i in top], stop - start
+
+    # Row positions of the given names, in the original row order
+    def rows_for(self, name_ids):
+        if len(name_ids) == 0:
+            return np.empty(0, dtype=np.int32)
+        # Many names or rows: one vectorized pass over the codes beats gathering the groups
+        name_ids = np.asarray(name_ids)
+        n_rows = int((self.offsets[name_ids + 1] - self.offsets[name_ids]).sum())
+        if len(name_ids) > self.size // PASS_RATIO or n_rows > self.size // 8:
+            selected = np.zeros(len(self.names) + 1, dtype=bool)
+            selected[name_ids] = True
+            return np.flatnonzero(selected[self.codes]).astype(np.int32)
+        positions = np.concatenate([self.rows[self.offsets[i]:self.offsets[i + 1]] for i in name_ids])
+        positions.sort()
+        return positions
+
+    # Row positions whose name contains the term
+    def search(self, term):
+        return self.rows_for(self.match_names(term))
+
+    # Row positions whose name starts with the prefix
+    def prefix(self, prefix):
+        return self.rows_for(self.match_prefix(prefix))
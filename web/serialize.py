@@ -0,0 +1,66 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+# JSON encoding of a page of the dataset straight from its column arrays.
+# Every column is turned into a list of JSON fragments in one pass over the
+# underlying array (NaN, inf and NaT become null), and the fragments are then
+# stitched into either a list of records or a compact columnar object, without
+# building a dict per row or going through a custom JSONEncoder.
+
+encode_string = json.encoder.encode_basestring_ascii
+
+
+def encode_value(value):
+    if isinstance(value, str):
+        return encode_string(value)
+    if value is None or (not isinstance(value, (list, tuple, dict)) and pd.isna(value)):
+        return 'null'
+    if isinstance(value, float) and not np.isfinite(value):
+        return 'null'
+    return json.dumps(value)
+
+
+# JSON fragments for the values of one column
+def encode_column(values):
+    dtype = values.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        # Encode each category once; code -1 (missing) picks the trailing null
+        categories = encode_column(pd.Series(dtype.categories)) + ['null']
+        return [categories[code] for code in values.cat.codes.tolist()]
+    if pd.api.types.is_bool_dtype(dtype) and not values.hasnans:
+        return ['true' if value else 'false' for value in values.tolist()]
+    if pd.api.types.is_integer_dtype(dtype) and not values.hasnans:
+        return list(map(str, values.tolist()))
+    if pd.api.types.is_float_dtype(dtype):
+        array = values.to_numpy(dtype=np.float64, na_value=np.nan)
+        fragments = list(map(float.__repr__, array.tolist()))
+        for i in np.flatnonzero(~np.isfinite(array)).tolist():
+            fragments[i] = 'null'
+        return fragments
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        values = values.dt.strftime('%Y-%m-%d')
+    return [encode_string(value) if isinstance(value, str) else encode_value(value) for value in values.tolist()]
+
+
+# '[{"col": value, ...}, ...]' for the rows of the frame
+def encode_records(frame):
+    if frame.empty:
+        return '[]'
+    keys = [encode_string(str(col)) for col in frame.columns]
+    template = '{{' + ','.join(key.replace('{', '{{').replace('}', '}}') + ':{}' for key in keys) + '}}'
+    columns = [encode_column(frame[col]) for col in frame.columns]
+    return '[' + ','.join(template.format(*row) for row in zip(*columns)) + ']'
+
+
+# '{"col": [values...], ...}' - the same data without repeating the keys per row
+def encode_columns(frame):
+    return '{' + ','.join(encode_string(str(col)) + ':[' + ','.join(encode_column(frame[col])) + ']'
+                          for col in frame.columns) + '}'
+
+
+# A JSON object whose `data` member is already-encoded JSON text
+def encode_envelope(data, **fields):
+    head = json.dumps(fields)
+    return head[:-1] + (', ' if fields else '') + '"data": ' + data + '}'
@@ -0,0 +1,113 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from werkzeug.security import safe_join
+
+from thumbnails import DiskCache, Image
+
+# Contact sheets ("sprites") of a page of grid tiles: one JPEG holding the
+# page's faces in a fixed grid, so a page costs one image request instead of
+# one per tile. Every tile is the centre square of the crop scaled to the cell
+# size, so the offsets are known before the sheet exists: /api/sprite answers
+# at once, the sheet is composed on a background thread, and a request for the
+# sheet waits for it (or composes it when another process was asked).
+
+SPRITE_SIZES = (64, 128, 256)  # Cell size in pixels
+SPRITE_COLUMNS = 10
+SPRITE_MAX_TILES = 100
+SPRITE_QUALITY = 80
+SPRITE_CACHE_DIR = '../sprite_cache'
+SPRITE_CACHE_MB = 512
+SPRITE_WORKERS = 2
+# Background colour of cells whose image is missing or unreadable
+SPRITE_BACKGROUND = (240, 240, 240)
+
+
+# Grid and tile offsets of a sheet of `count` cells
+def sprite_layout(count, size, columns=SPRITE_COLUMNS):
+    columns = max(1, min(columns, count))
+    rows = -(-count // columns)
+    return {
+        'size': size,
+        'columns': columns,
+        'rows': rows,
+        'width': columns * size,
+        'height': rows * size,
+        'tiles': [[(i % columns) * size, (i // columns) * size] for i in range(count)],
+    }
+
+
+# Compose a sheet; paths that are None, missing or unreadable leave their cell empty
+def make_sprite(source_root, paths, size, target):
+    layout = sprite_layout(len(paths), size)
+    sheet = Image.new('RGB', (layout['width'], layout['height']), SPRITE_BACKGROUND)
+    for path, (x, y) in zip(paths, layout['tiles']):
+        source = safe_join(source_root, path) if path else None
+        if source is None:
+            continue
+        try:
+            with Image.open(source) as img:
+                img.draft('RGB', (size, size))
+                img = img.convert('RGB')
+                side = min(img.size)
+                left, top = (img.width - side) // 2, (img.height - side) // 2
+                tile = img.resize((size, size), Image.LANCZOS, box=(left, top, left + side, top + side))
+        except OSError:
+            continue
+        sheet.paste(tile, (x, y))
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+    sheet.save(tmp, 'JPEG', quality=SPRITE_QUALITY, optimize=True)
+    os.replace(tmp, target)
+    return os.path.getsize(target)
+
+
+class SpriteCache(DiskCache):
+    def __init__(self, source_root, cache_root=SPRITE_CACHE_DIR, max_bytes=SPRITE_CACHE_MB * 2**20,
+                 workers=SPRITE_WORKERS):
+        super().__init__(cache_root, max_bytes)
+        self.source_root = source_root
+        # Threads start on the first submit, so a preloading master forks none
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sprite')
+        self.pending = {}  # name -> Future of the sheet being composed
+        self.pending_lock = threading.Lock()
+
+    def path(self, size, name):
+        return os.path.join(self.cache_root, str(size), name + '.jpg')
+
+    # Start composing a sheet in the background, unless it exists or is under way;
+    # returns the Future of the composition, if any
+    def prepare(self, size, name, paths):
+        with self.pending_lock:
+            if name in self.pending:
+                return self.pending[name]
+            if os.path.exists(self.path(size, name)):
+                return None
+            future = self.pending[name] = self.executor.submit(self.make, size, name, paths)
+            return future
+
+    def make(self, size, name, paths):
+        try:
+            self.added(make_sprite(self.source_root, paths, size, self.path(size, name)))
+        except OSError as e:
+            print(f"Error making sprite {name}: {e}")
+        finally:
+            with self.pending_lock:
+                self.pending.pop(name, None)
+
+    # Path of a sheet, waiting for its composition (or starting it) if needed;
+    # paths() gives the tile paths, only called when the sheet is not on disk
+    def get(self, size, name, paths, timeout=None):
+        target = self.path(size, name)
+        if os.path.exists(target):
+            self.touch(target)
+            return target
+        future = self.prepare(size, name, paths())
+        if future is not None:
+            try:
+                future.result(timeout)
+            except TimeoutError:
+                return None
+        return target if os.path.exists(target) else None
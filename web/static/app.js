@@ -2,11 +2,20 @@
 let currentPage = 1;
 let totalPages = 1;
 let pageSize = 20;
+// Image server base URL; ':<port>' means the same host on another port
+const imageBase = (base => base.startsWith(':') ? `${location.protocol}//${location.hostname}${base}` : base)(
+    document.body.dataset.imageBase || '');
+let thumbSize = 256; // Grid tiles load thumbnails of this size; the viewer loads the full crop
+let spriteSize = 256; // Each grid page comes with one contact sheet of its tiles, in cells of this size
+let namesLimit = 100; // Suggestions shown in the sidebar per prefix
+let namesTimer = null;
+let namesRequest = 0; // Id of the latest names request, to drop stale responses
 let currentData = [];
 let selectedImageIndex = -1;
 let isLoading = false;
 let allDataLoaded = false;
 let currentSearchTerm = '';
+let nextCursor = null; // Opaque cursor for the next page of the current query
 
 // DOM elements
 const imageList = document.getElementById('image-list');
@@ -16,6 +25,7 @@ const nextBtn = document.getElementById('next-btn');
 const pageInfo = document.getElementById('page-info');
 const searchInput = document.getElementById('search');
 const searchBtn = document.getElementById('search-btn');
+const sortSelect = document.getElementById('sort');
 const namesList = document.getElementById('names-list');
 const paginationContainer = document.querySelector('.pagination');
 const scrollInfo = document.getElementById('scroll-info');
@@ -28,10 +38,12 @@ const metaDob = document.getElementById('meta-dob');
 const metaPhotoTaken = document.getElementById('meta-photo-taken');
 const metaFaceLocation = document.getElementById('meta-face-location');
 const metaCelebId = document.getElementById('meta-celeb-id');
+const metaSource = document.getElementById('meta-source');
 const metaPath = document.getElementById('meta-path');
 
-// Global name list
+// Names shown in the sidebar: {name, count} entries matching the typed prefix
 let uniqueNames = [];
+let uniqueNamesTotal = 0;
 
 // Initialize app
 document.addEventListener('DOMContentLoaded', () => {
@@ -43,12 +55,19 @@ document.addEventListener('DOMContentLoaded', () => {
     prevBtn.addEventListener('click', goToPrevPage);
     nextBtn.addEventListener('click', goToNextPage);
     searchBtn.addEventListener('click', handleSearch);
+    sortSelect.addEventListener('change', handleSearch);
     searchInput.addEventListener('keypress', (e) => {
         if (e.key === 'Enter') {
             handleSearch();
         }
     });
     
+    // Autocomplete the sidebar names as the user types
+    searchInput.addEventListener('input', () => {
+        clearTimeout(namesTimer);
+        namesTimer = setTimeout(() => loadUniqueNames(searchInput.value.trim()), 150);
+    });
+    
     // Add scroll event listener for infinite scroll
     window.addEventListener('scroll', checkForInfiniteScroll);
 });
@@ -64,7 +83,7 @@ function checkForInfiniteScroll() {
     const clientHeight = document.documentElement.clientHeight;
     
     if (scrollTop + clientHeight + 200 >= scrollHeight) {
-        if (currentPage < totalPages) {
+        if (nextCursor) {
             loadMoreData();
         } else {
             allDataLoaded = true;
@@ -84,14 +103,20 @@ function showEndOfResultsMessage() {
     }
 }
 
-// Load unique names for the sidebar
-function loadUniqueNames() {
-    namesList.innerHTML = '<div class="loading">Loading names...</div>';
+// Load the names starting with a prefix for the sidebar
+function loadUniqueNames(prefix = '') {
+    if (uniqueNames.length === 0) {
+        namesList.innerHTML = '<div class="loading">Loading names...</div>';
+    }
     
-    fetch('/api/unique-names')
+    const requestId = ++namesRequest;
+    fetch(`/api/names?prefix=${encodeURIComponent(prefix)}&limit=${namesLimit}`)
         .then(response => response.json())
         .then(data => {
+            // Ignore responses for a prefix the user has already typed past
+            if (requestId !== namesRequest) return;
             uniqueNames = data.names || [];
+            uniqueNamesTotal = data.total || 0;
             renderNamesList();
         })
         .catch(error => {
@@ -110,7 +135,7 @@ function highlightActiveName(searchTerm) {
     
     // Add active class to matching item
     allItems.forEach(item => {
-        if (item.textContent.toLowerCase() === searchTerm.toLowerCase()) {
+        if (item.dataset.name.toLowerCase() === searchTerm.toLowerCase()) {
             item.classList.add('active');
             // Optionally scroll to the item to make it visible
             item.scrollIntoView({ behavior: 'smooth', block: 'nearest' });
@@ -122,18 +147,38 @@ function highlightActiveName(searchTerm) {
 function renderNamesList() {
     namesList.innerHTML = '';
     
-    uniqueNames.forEach(name => {
+    if (uniqueNames.length === 0) {
+        namesList.innerHTML = '<div class="no-names">No matching names</div>';
+        return;
+    }
+    
+    uniqueNames.forEach(entry => {
         const nameItem = document.createElement('div');
         nameItem.className = 'name-item';
-        nameItem.textContent = name;
+        nameItem.dataset.name = entry.name;
+        nameItem.textContent = entry.name;
+        
+        const countElem = document.createElement('span');
+        countElem.className = 'name-count';
+        countElem.textContent = entry.count;
+        nameItem.appendChild(countElem);
+        
         nameItem.addEventListener('click', () => {
-            searchInput.value = name;
+            searchInput.value = entry.name;
             handleSearch();
         });
         
         namesList.appendChild(nameItem);
     });
     
+    // Only the first names are sent; typing narrows the list down
+    if (uniqueNamesTotal > uniqueNames.length) {
+        const moreElem = document.createElement('div');
+        moreElem.className = 'no-names';
+        moreElem.textContent = `${uniqueNamesTotal - uniqueNames.length} more - type to narrow down`;
+        namesList.appendChild(moreElem);
+    }
+    
     // If we have a current search term, highlight it
     const searchTerm = searchInput.value.trim();
     if (searchTerm) {
@@ -145,7 +190,8 @@ function renderNamesList() {
 function loadData() {
     const searchTerm = searchInput.value.trim();
     currentSearchTerm = searchTerm; // Store the current search term
-    const url = `/api/data?page=${currentPage}&limit=${pageSize}${searchTerm ? `&search=${searchTerm}` : ''}`;
+    const [sort, order] = sortSelect.value.split(':');
+    const url = `/api/sprite?size=${spriteSize}&page=${currentPage}&limit=${pageSize}${searchTerm ? `&search=${encodeURIComponent(searchTerm)}` : ''}${sort ? `&sort=${sort}&order=${order}` : ''}`;
     
     isLoading = true;
     allDataLoaded = false;
@@ -167,9 +213,10 @@ function loadData() {
             
             currentData = data.data;
             totalPages = Math.ceil(data.total / pageSize);
+            nextCursor = data.next_cursor;
             
             updatePagination();
-            renderImageList(true); // true = replace existing content
+            renderImageList(true, data.sprite); // true = replace existing content
             
             // Show search results message
             const resultCount = data.total;
@@ -230,7 +277,7 @@ function loadData() {
 
 // Load more data for infinite scroll
 function loadMoreData() {
-    if (isLoading || currentPage >= totalPages) return;
+    if (isLoading || !nextCursor) return;
     
     isLoading = true;
     currentPage++;
@@ -241,7 +288,8 @@ function loadMoreData() {
     loadingIndicator.textContent = 'Loading more...';
     imageList.appendChild(loadingIndicator);
     
-    const url = `/api/data?page=${currentPage}&limit=${pageSize}${currentSearchTerm ? `&search=${currentSearchTerm}` : ''}`;
+    // The cursor carries the query, so later pages never refilter or overlap
+    const url = `/api/sprite?size=${spriteSize}&cursor=${encodeURIComponent(nextCursor)}&limit=${pageSize}`;
     
     fetch(url)
         .then(response => {
@@ -261,6 +309,8 @@ function loadMoreData() {
                 loadingElem.remove();
             }
             
+            nextCursor = data.next_cursor;
+            
             // Append new data to existing data
             const newData = data.data;
             if (newData.length > 0) {
@@ -268,9 +318,10 @@ function loadMoreData() {
                 currentData = [...currentData, ...newData];
                 
                 // Render only the new images
-                renderAdditionalImages(newData, startIndex);
+                renderAdditionalImages(newData, startIndex, data.sprite);
                 updatePagination();
-            } else {
+            }
+            if (!nextCursor) {
                 // If no more data, mark as all loaded
                 allDataLoaded = true;
                 showEndOfResultsMessage();
@@ -292,51 +343,83 @@ function loadMoreData() {
         });
 }
 
-// Render image list
-function renderImageList(replaceExisting = true) {
-    if (replaceExisting) {
-        imageList.innerHTML = '';
+// Image URL for a row; rows the server flagged as missing go straight to the placeholder
+function imageUrl(item, prefix) {
+    if (item.has_image === false) {
+        return '/static/placeholder.jpg';
     }
-    
-    currentData.forEach((item, index) => {
-        const imageItem = document.createElement('div');
-        imageItem.className = 'image-item';
-        imageItem.dataset.index = index;
-        
-        const img = document.createElement('img');
-        img.src = `/images/${item.path}`; // Use the image serving endpoint
-        img.alt = item.name || 'Unknown';
-        img.onerror = function() {
-            this.src = '/static/placeholder.jpg'; // Fallback image
-        };
-        
-        imageItem.appendChild(img);
-        imageItem.addEventListener('click', () => selectImage(index));
-        
-        imageList.appendChild(imageItem);
-    });
+    return `${imageBase}${prefix}${item.path}`;
 }
 
-// Render additional images for infinite scroll
-function renderAdditionalImages(newData, startIndex) {
-    newData.forEach((item, relativeIndex) => {
+// Downscaled copy of a row's image for its grid tile
+function createThumbnail(item) {
+    const img = document.createElement('img');
+    img.src = imageUrl(item, `/thumbs/${thumbSize}/`);
+    img.alt = item.name || 'Unknown';
+    img.onerror = function() {
+        this.src = '/static/placeholder.jpg'; // Fallback image
+    };
+    return img;
+}
+
+// Cell of a page's contact sheet; percentages keep the offset right at any tile size
+function createSpriteCell(item, sprite, tile) {
+    const cell = document.createElement('div');
+    cell.className = 'sprite-tile';
+    cell.title = item.name || 'Unknown';
+    const [x, y] = tile;
+    const left = sprite.columns > 1 ? x / (sprite.width - sprite.size) * 100 : 0;
+    const top = sprite.rows > 1 ? y / (sprite.height - sprite.size) * 100 : 0;
+    cell.style.backgroundSize = `${sprite.columns * 100}% ${sprite.rows * 100}%`;
+    cell.style.backgroundPosition = `${left}% ${top}%`;
+    return cell;
+}
+
+// Render grid tiles for rows of the current data, starting at startIndex. With a
+// contact sheet the tiles are cells of that one image, shown once it has loaded;
+// if it fails to load, every tile falls back to its own thumbnail.
+function renderTiles(items, startIndex, sprite) {
+    const cells = [];
+    items.forEach((item, relativeIndex) => {
         const index = startIndex + relativeIndex;
         const imageItem = document.createElement('div');
         imageItem.className = 'image-item';
         imageItem.dataset.index = index;
         
-        const img = document.createElement('img');
-        img.src = `/images/${item.path}`;
-        img.alt = item.name || 'Unknown';
-        img.onerror = function() {
-            this.src = '/static/placeholder.jpg'; // Fallback image
-        };
-        
-        imageItem.appendChild(img);
+        const tile = sprite && sprite.tiles[relativeIndex];
+        if (tile) {
+            const cell = createSpriteCell(item, sprite, tile);
+            cells.push({ cell, item });
+            imageItem.appendChild(cell);
+        } else {
+            imageItem.appendChild(createThumbnail(item));
+        }
         imageItem.addEventListener('click', () => selectImage(index));
         
         imageList.appendChild(imageItem);
     });
+    
+    if (cells.length > 0) {
+        const sheet = new Image();
+        sheet.onload = () => cells.forEach(({ cell }) => {
+            cell.style.backgroundImage = `url("${sprite.url}")`;
+        });
+        sheet.onerror = () => cells.forEach(({ cell, item }) => cell.replaceWith(createThumbnail(item)));
+        sheet.src = sprite.url;
+    }
+}
+
+// Render image list
+function renderImageList(replaceExisting = true, sprite = null) {
+    if (replaceExisting) {
+        imageList.innerHTML = '';
+    }
+    renderTiles(currentData, 0, sprite);
+}
+
+// Render additional images for infinite scroll
+function renderAdditionalImages(newData, startIndex, sprite = null) {
+    renderTiles(newData, startIndex, sprite);
 }
 
 // Select an image and display its metadata
@@ -355,7 +438,7 @@ function selectImage(index) {
     }
     
     // Update main image
-    currentImage.src = `/images/${item.path}`;
+    currentImage.src = imageUrl(item, '/images/');
     currentImage.alt = item.name || 'Unknown';
     currentImage.onerror = function() {
         this.src = '/static/placeholder.jpg'; // Fallback image
@@ -369,6 +452,7 @@ function selectImage(index) {
     metaPhotoTaken.textContent = item.photo_taken || 'Unknown';
     metaFaceLocation.textContent = item.face_location || 'Unknown';
     metaCelebId.textContent = (item.celeb_id !== null && item.celeb_id > 0) ? item.celeb_id : 'Unknown';
+    metaSource.textContent = item.source || 'imdb';
     metaPath.textContent = item.path || 'Unknown';
 }
 
@@ -385,6 +469,7 @@ function clearImageDetails() {
     metaPhotoTaken.textContent = '-';
     metaFaceLocation.textContent = '-';
     metaCelebId.textContent = '-';
+    metaSource.textContent = '-';
     metaPath.textContent = '-';
 }
 
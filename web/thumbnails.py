@@ -0,0 +1,176 @@
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import safe_join
+
+# Pillow is optional: without it /thumbs/ falls back to the full-size crops
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# On-demand thumbnails of the face crops. A thumbnail is made on its first
+# request and kept under <cache_root>/<size>/<dataset path>; once the cache
+# grows past its byte budget the least recently used files are evicted.
+
+THUMB_SIZES = (128, 256, 512)  # Longest side in pixels; the grid uses 256
+THUMB_QUALITY = 85
+THUMB_CACHE_DIR = '../thumb_cache'
+THUMB_CACHE_MB = 2048
+# Eviction trims the cache down to this fraction of the budget, so it runs rarely
+EVICT_TO = 0.9
+PREWARM_CHUNK = 256
+
+
+# Resize one image into a JPEG thumbnail; written to a temporary file first so
+# concurrent requests never see a partial thumbnail
+def make_thumbnail(source, target, size):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with Image.open(source) as img:
+        # Let the JPEG decoder downscale by a power of two while decoding
+        img.draft('RGB', (size, size))
+        img = img.convert('RGB')
+        img.thumbnail((size, size), Image.LANCZOS)
+        img.save(tmp, 'JPEG', quality=THUMB_QUALITY, optimize=True)
+    os.replace(tmp, target)
+    return os.path.getsize(target)
+
+
+def iter_cache_files(cache_root):
+    stack = [cache_root]
+    while stack:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+            elif not entry.name.endswith('.tmp'):
+                yield entry
+
+
+# Generated files under cache_root, kept within a byte budget by evicting the
+# least recently used ones (by access time)
+class DiskCache:
+    def __init__(self, cache_root, max_bytes):
+        self.cache_root = cache_root
+        self.max_bytes = max_bytes
+        self.bytes = None  # Measured on first use
+        self.lock = threading.Lock()
+
+    @property
+    def available(self):
+        return Image is not None
+
+    # Mark an access for eviction; the modification time (and so the ETag) is kept
+    def touch(self, path):
+        os.utime(path, ns=(time.time_ns(), os.stat(path).st_mtime_ns))
+
+    def added(self, written):
+        with self.lock:
+            if self.bytes is None:
+                self.bytes = sum(entry.stat().st_size for entry in iter_cache_files(self.cache_root))
+            else:
+                self.bytes += written
+            if self.bytes <= self.max_bytes:
+                return
+            self.bytes = self.evict()
+
+    # Delete the least recently used files until the cache is back under budget
+    def evict(self):
+        files = [(entry.stat().st_atime, entry.stat().st_size, entry.path)
+                 for entry in iter_cache_files(self.cache_root)]
+        total = sum(size for _, size, _ in files)
+        files.sort()
+        removed = 0
+        for _, size, path in files:
+            if total <= self.max_bytes * EVICT_TO:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        if removed:
+            print(f"Evicted {removed} files from {self.cache_root}, cache now {total / 2**20:.0f} MB")
+        return total
+
+
+class ThumbnailCache(DiskCache):
+    def __init__(self, source_root, cache_root=THUMB_CACHE_DIR, max_bytes=THUMB_CACHE_MB * 2**20):
+        super().__init__(cache_root, max_bytes)
+        self.source_root = source_root
+
+    # Path of the thumbnail for a dataset path, made on first request.
+    # Returns None when the source image does not exist.
+    def get(self, size, path):
+        target = safe_join(self.cache_root, str(size), path)
+        source = safe_join(self.source_root, path)
+        if target is None or source is None:
+            return None
+        if os.path.exists(target):
+            self.touch(target)
+            return target
+        if not os.path.isfile(source):
+            return None
+        written = make_thumbnail(source, target, size)
+        self.added(written)
+        return target
+
+
+# Make the missing thumbnails for one chunk of dataset paths (pool worker)
+def prewarm_chunk(source_root, cache_root, size, paths):
+    made = missing = 0
+    for path in paths:
+        target = safe_join(cache_root, str(size), path)
+        source = safe_join(source_root, path)
+        if target is None or source is None or os.path.exists(target):
+            continue
+        try:
+            make_thumbnail(source, target, size)
+            made += 1
+        except (FileNotFoundError, OSError):
+            missing += 1
+    return made, missing
+
+
+def prewarm(paths, sizes, source_root, cache_root, max_bytes, workers=None):
+    start = time.time()
+    made = missing = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(prewarm_chunk, source_root, cache_root, size, paths[i:i + PREWARM_CHUNK])
+                   for size in sizes for i in range(0, len(paths), PREWARM_CHUNK)]
+        for done, future in enumerate(futures, 1):
+            chunk_made, chunk_missing = future.result()
+            made += chunk_made
+            missing += chunk_missing
+            if done % 100 == 0 or done == len(futures):
+                print(f"  {done}/{len(futures)} chunks, {made} thumbnails made, {missing} unreadable")
+    ThumbnailCache(source_root, cache_root, max_bytes).added(0)
+    print(f"Pre-warmed {made} thumbnails in {time.time() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description='Pre-generate thumbnails for every image in the dataset')
+    parser.add_argument('--dataset', default='../dataset.parquet')
+    parser.add_argument('--source-root', default='..', help='directory the dataset paths are relative to')
+    parser.add_argument('--cache-dir', default=THUMB_CACHE_DIR)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[256], choices=THUMB_SIZES)
+    parser.add_argument('--max-cache', type=int, default=THUMB_CACHE_MB, help='cache budget in MB')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--limit', type=int, default=None, help='only the first N dataset rows')
+    args = parser.parse_args()
+
+    if Image is None:
+        raise SystemExit("Pillow is required to make thumbnails (pip install Pillow)")
+    paths = pd.read_parquet(args.dataset, columns=['path'])['path'].tolist()[:args.limit]
+    print(f"Making {len(paths)} x {len(args.sizes)} thumbnails in {args.cache_dir}...")
+    prewarm(paths, args.sizes, args.source_root, args.cache_dir, args.max_cache * 2**20, args.workers)
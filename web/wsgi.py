@@ -0,0 +1,15 @@
+import gc
+
+from app import app, datasets
+
+# WSGI entry point for the production server (gunicorn -c gunicorn.conf.py wsgi:app).
+# With preload_app the dataset, the search and filter indexes and the name list
+# are built once in the master process, and the forked workers share them
+# copy-on-write. The master also watches the dataset files, and after loading a
+# regenerated dataset restarts the workers so they share it too (see when_ready
+# in gunicorn.conf.py).
+datasets.load()
+
+# Move everything loaded so far out of the collector's reach: otherwise each
+# worker's garbage collections would write to these objects and copy their pages
+gc.freeze()